@@ -5,36 +5,1914 @@ Description: Un outil de recherche de données dans des fichiers avec une interf
 Auteur: [Saucisson.flp]
 Date: 28/06/2025
 """
+import time
+_PROCESS_START = time.perf_counter() # Référence pour mesurer le démarrage à froid (--bench-startup)
 import os
 import sys
 import json
+import codecs
 import csv
-import tkinter as tk # Ajout de colorchooser
-from tkinter import ttk, filedialog, scrolledtext, font as tkFont, colorchooser
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import gzip
+import zlib
+import struct
+import io
+import re
+import heapq
+import hashlib
+import hmac
+import secrets
+from array import array
+import tempfile
+import contextlib
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, Future, wait, as_completed, FIRST_COMPLETED
+from collections import deque
 import queue 
+import socket
+import socketserver
+import threading
 import multiprocessing # Pour freeze_support avec ProcessPoolExecutor
+from multiprocessing import shared_memory
 import platform
 
-# Glisser-Déposer
-try:
-    from tkinterdnd2 import DND_FILES, TkinterDnD
-except ImportError:
-    TkinterDnD = None # Garder une trace si l'import échoue
-
-# Importation conditionnelle de ctypes pour les coins arrondis sur Windows uniquement /!\
+# Les modules d'interface sont importés par _import_ui_modules() et non au chargement du module :
+# les processus de recherche (spawn sous Windows) relancent ce script et n'ont pas besoin de Tk.
+tk = ttk = filedialog = scrolledtext = tkFont = colorchooser = None
 _ctypes_available = False
-if platform.system() == "Windows":
+
+def _import_ui_modules():
+    """Importe Tk (et ctypes sous Windows pour les coins arrondis). Appelé uniquement par le processus principal."""
+    global tk, ttk, filedialog, scrolledtext, tkFont, colorchooser, ctypes, _ctypes_available
+    import tkinter as tk
+    from tkinter import ttk, filedialog, scrolledtext, font as tkFont, colorchooser
+
+    # Importation conditionnelle de ctypes pour les coins arrondis sur Windows uniquement /!\
+    if platform.system() == "Windows":
+        try:
+            import ctypes
+            _ctypes_available = True
+        except ImportError:
+            print("ctypes non disponible, les coins arrondis de la fenêtre ne seront pas appliqués.")
+            _ctypes_available = False
+
+# --- Index de clés triées pour la recherche exacte par champ ---
+# Un index par (fichier source, colonne) : fichier texte trié "clé\toffset\tlongueur\tnuméro\n",
+# interrogé par recherche dichotomique directement sur le disque (O(log n) seeks).
+INDEX_DIR = "dlu_index"
+INDEX_SORT_RUN_SIZE = 500000 # Entrées triées en mémoire avant d'écrire un run temporaire (tri externe)
+INDEXABLE_EXTENSIONS = ('.csv', '.sql')
+
+_SQL_INSERT_RE = re.compile(r'^\s*INSERT\s+(?:IGNORE\s+)?INTO\s+(?:`[^`]+`|"[^"]+"|[^\s(]+)\s*(?:\(([^)]*)\))?\s*VALUES\s*', re.IGNORECASE)
+_SQL_ESCAPES = {'0': '\0', 'n': '\n', 'r': '\r', 't': '\t', 'Z': '\x1a', 'b': '\b'}
+
+def _redecode_latin1(texte):
+    """Les sources sont lues en latin-1 (1 caractère = 1 octet, offsets exacts). Réinterprète en UTF-8 si possible."""
+    try:
+        return texte.encode('latin-1').decode('utf-8')
+    except UnicodeError:
+        return texte
+
+def _escape_index_key(key):
+    """Échappe les caractères qui casseraient le format ligne/tabulation du fichier d'index."""
+    return key.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+def _normalize_index_key(key, case_sensitive):
+    key = key.strip()
+    return key if case_sensitive else key.lower()
+
+def _resolve_column(column, header_fields):
+    """Retourne l'index (base 0) de la colonne : numéro (base 1) ou nom présent dans l'en-tête."""
+    column = str(column).strip()
+    if column.isdigit():
+        return int(column) - 1
+    if header_fields:
+        lowered = [h.strip().strip('`"[] ').lower() for h in header_fields]
+        if column.lower() in lowered:
+            return lowered.index(column.lower())
+    return None
+
+def _parse_sql_insert_line(line):
+    """Découpe une ligne INSERT INTO ... VALUES (...),(...); en tuples.
+    Retourne (colonnes ou None, [(début, fin, valeurs), ...]) ou None si ce n'est pas un INSERT."""
+    m = _SQL_INSERT_RE.match(line)
+    if not m:
+        return None
+    columns = [c.strip() for c in m.group(1).split(',')] if m.group(1) else None
+    rows = []
+    pos, n = m.end(), len(line)
+    while pos < n:
+        while pos < n and line[pos] != '(':
+            if line[pos] == ';':
+                return columns, rows
+            pos += 1
+        if pos >= n:
+            break
+        start = pos
+        pos += 1
+        values, current, in_quote, quoted = [], [], False, False
+        while pos < n:
+            c = line[pos]
+            if in_quote:
+                if c == '\\' and pos + 1 < n:
+                    current.append(_SQL_ESCAPES.get(line[pos + 1], line[pos + 1]))
+                    pos += 2
+                    continue
+                if c == "'":
+                    if pos + 1 < n and line[pos + 1] == "'":
+                        current.append("'")
+                        pos += 2
+                        continue
+                    in_quote = False
+                else:
+                    current.append(c)
+                pos += 1
+                continue
+            if c == "'":
+                in_quote = quoted = True
+            elif c == ',' or c == ')':
+                value = ''.join(current) if quoted else ''.join(current).strip()
+                values.append('' if (not quoted and value.upper() == 'NULL') else value)
+                current, quoted = [], False
+                if c == ')':
+                    pos += 1
+                    rows.append((start, pos, values))
+                    break
+            else:
+                current.append(c)
+            pos += 1
+        else:
+            break # Tuple non terminé sur cette ligne
+    return columns, rows
+
+def _iter_indexable_records(source_path, column):
+    """Itère sur (clé brute, offset, longueur, numéro) pour la colonne demandée d'un CSV ou d'un dump SQL."""
+    is_csv = source_path.lower().endswith('.csv')
+    with open(source_path, 'rb') as f:
+        if is_csv:
+            state = {'offset': 0}
+            def lines():
+                for raw in f:
+                    state['offset'] += len(raw)
+                    yield raw.decode('latin-1')
+            reader = csv.reader(lines())
+            col_idx = None
+            record_no = 0
+            while True:
+                record_start = state['offset']
+                try:
+                    fields = next(reader)
+                except StopIteration:
+                    break
+                record_no += 1
+                if record_no == 1:
+                    col_idx = _resolve_column(column, fields)
+                    if col_idx is None:
+                        raise ValueError(f"colonne '{column}' introuvable")
+                    if not str(column).strip().isdigit():
+                        continue # La première ligne est l'en-tête
+                if col_idx < len(fields):
+                    yield _redecode_latin1(fields[col_idx]), record_start, state['offset'] - record_start, record_no
+        else:
+            offset = 0
+            for line_no, raw in enumerate(f, start=1):
+                line = raw.decode('latin-1')
+                parsed = _parse_sql_insert_line(line)
+                if parsed:
+                    columns, rows = parsed
+                    col_idx = _resolve_column(column, columns)
+                    if col_idx is not None:
+                        for start, end, values in rows:
+                            if col_idx < len(values):
+                                yield _redecode_latin1(values[col_idx]), offset + start, end - start, line_no
+                offset += len(raw)
+
+def _field_index_paths(source_path, column, case_sensitive):
+    ident = f"{os.path.abspath(source_path)}|{str(column).strip().lower()}|{int(bool(case_sensitive))}"
+    name = hashlib.sha1(ident.encode('utf-8')).hexdigest()[:24]
+    return os.path.join(INDEX_DIR, name + ".idx"), os.path.join(INDEX_DIR, name + ".meta.json")
+
+def _field_index_is_fresh(source_path, meta_path):
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        st = os.stat(source_path)
+        return meta.get("size") == st.st_size and meta.get("mtime_ns") == st.st_mtime_ns
+    except (OSError, ValueError):
+        return False
+
+def _index_line_key(line):
+    return line.split(b'\t', 1)[0]
+
+def build_field_index(source_path, column, case_sensitive=False):
+    """Construit (ou reconstruit) l'index trié d'une colonne. Tri externe par runs pour borner la mémoire."""
+    index_path, meta_path = _field_index_paths(source_path, column, case_sensitive)
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    st = os.stat(source_path)
+    runs, buffer = [], []
+
+    def flush_run():
+        buffer.sort()
+        run = tempfile.TemporaryFile(dir=INDEX_DIR)
+        run.writelines(b"%s\t%d\t%d\t%d\n" % (k.encode('utf-8'), o, l, r) for k, o, l, r in buffer)
+        run.seek(0)
+        runs.append(run)
+        buffer.clear()
+
+    try:
+        for key, offset, length, record_no in _iter_indexable_records(source_path, column):
+            key = _escape_index_key(_normalize_index_key(key, case_sensitive))
+            if key:
+                buffer.append((key, offset, length, record_no))
+                if len(buffer) >= INDEX_SORT_RUN_SIZE:
+                    flush_run()
+        if buffer or not runs:
+            flush_run()
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, 'wb') as out:
+            out.writelines(heapq.merge(*runs, key=_index_line_key))
+        os.replace(tmp_path, index_path)
+    finally:
+        for run in runs:
+            run.close()
+
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"source": os.path.abspath(source_path), "column": str(column), "case_sensitive": bool(case_sensitive),
+                   "size": st.st_size, "mtime_ns": st.st_mtime_ns}, f)
+    return index_path
+
+def lookup_field_index(index_path, key, case_sensitive=False):
+    """Recherche dichotomique sur disque. Retourne [(offset, longueur, numéro), ...] pour la clé exacte."""
+    target = _escape_index_key(_normalize_index_key(key, case_sensitive)).encode('utf-8')
+    matches = []
+    with open(index_path, 'rb') as f:
+        lo, hi = 0, os.fstat(f.fileno()).st_size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            f.seek(mid)
+            if mid:
+                f.readline() # Se réaligner sur la ligne suivante
+            line = f.readline()
+            if line and _index_line_key(line) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        f.seek(lo)
+        if lo:
+            f.readline()
+        for line in f:
+            fields = line.rstrip(b'\n').split(b'\t')
+            if fields[0] != target:
+                break
+            matches.append((int(fields[1]), int(fields[2]), int(fields[3])))
+    return matches
+
+def _read_indexed_record(source_file, offset, length, is_csv):
+    """Relit l'enregistrement d'origine par un seul seek et le formate comme la recherche classique."""
+    source_file.seek(offset)
+    text = _redecode_latin1(source_file.read(length).decode('latin-1'))
+    if is_csv:
+        fields = next(csv.reader(io.StringIO(text)), [])
+        return ' | '.join(fields)
+    return text.strip()
+
+# --- Lignes pathologiques (fichier sans saut de ligne, dump minifié) : mémoire bornée par worker ---
+# Une ligne qui ne tient pas dans un bloc de lecture est parcourue par fenêtres de taille fixe qui se recouvrent ;
+# chaque occurrence y devient un hit, affiché sous forme d'extrait avec son offset en octets.
+LONG_LINE_WINDOW = 1024 * 1024 # Caractères (ou octets) lus au plus d'un coup dans une ligne longue
+MAX_HIT_LINE_CHARS = 4096 # Au-delà, un hit n'affiche qu'un extrait autour du terme
+HIT_EXCERPT_CHARS = 160 # Caractères gardés de chaque côté du terme dans un extrait
+
+class LongLineError(Exception):
+    """Ligne trop longue pour la lecture par lignes : le fichier doit être relu par fenêtres (scan_windowed_file)."""
+
+def clip_hit_line(ligne, needle='', normalize=str.lower):
+    """Ligne de hit telle qu'affichée : entière si courte, sinon extrait autour de la première occurrence de needle
+    (cherchée dans normalize(ligne)), ou début de la ligne si le terme n'y est pas retrouvé tel quel."""
+    if len(ligne) <= MAX_HIT_LINE_CHARS:
+        return ligne
+    pos = max(0, normalize(ligne).find(needle)) if needle else 0
+    return _excerpt(ligne, pos, len(needle), 0, len(ligne))
+
+def _excerpt(texte, pos, length, line_start, line_end):
+    start = max(line_start, pos - HIT_EXCERPT_CHARS)
+    end = min(line_end, pos + length + HIT_EXCERPT_CHARS)
+    return ('…' if start > line_start else '') + texte[start:end].strip() + ('…' if end < line_end else '')
+
+def iter_bounded_lines(fichier):
+    """Lignes d'un fichier texte, sans jamais lire plus de LONG_LINE_WINDOW caractères d'une même ligne."""
+    for ligne in iter(lambda: fichier.readline(LONG_LINE_WINDOW), ''):
+        if len(ligne) == LONG_LINE_WINDOW and not ligne.endswith('\n'):
+            raise LongLineError(f"ligne de plus de {LONG_LINE_WINDOW} caractères")
+        yield ligne
+
+def read_bounded_line(f, limit=LONG_LINE_WINDOW):
+    """Lit une ligne d'un fichier binaire sans en garder plus de limit octets : (début de la ligne, longueur complète).
+    Le reste d'une ligne plus longue est sauté, le fichier est alors positionné sur la ligne suivante."""
+    head = piece = f.readline(limit)
+    length = len(head)
+    while len(piece) == limit and not piece.endswith(b'\n'):
+        piece = f.readline(limit)
+        length += len(piece)
+    return head, length
+
+def iter_bounded_raw_lines(f, limit=LONG_LINE_WINDOW):
+    """(début de ligne, longueur complète) pour chaque ligne d'un fichier binaire, en mémoire bornée."""
+    while True:
+        head, length = read_bounded_line(f, limit)
+        if not length:
+            return
+        yield head, length
+
+def iter_exact_line_matches(haystack, term):
+    """Position de la première occurrence de term dans chaque ligne de haystack qui le contient."""
+    pos = haystack.find(term)
+    while pos != -1:
+        yield pos
+        next_nl = haystack.find('\n', pos)
+        if next_nl == -1:
+            return
+        pos = haystack.find(term, next_nl + 1)
+
+def iter_lines_at(texte, haystack, positions):
+    """(index de ligne, ligne de texte) pour des positions croissantes dans haystack, texte normalisé ligne à ligne."""
+    lignes = None
+    line_idx, counted_upto = 0, 0
+    for pos in positions:
+        line_idx += haystack.count('\n', counted_upto, pos)
+        counted_upto = pos
+        if lignes is None:
+            lignes = texte.split('\n')
+        yield line_idx, lignes[line_idx]
+
+def iter_exact_matching_lines(texte, term, case_sensitive):
+    """(index de ligne, ligne) des lignes d'un bloc de lignes complètes contenant term (déjà en minuscules
+    si la recherche ignore la casse) : un str.find sur tout le bloc plutôt qu'un test par ligne."""
+    haystack = texte if case_sensitive else texte.lower()
+    return iter_lines_at(texte, haystack, iter_exact_line_matches(haystack, term))
+
+_LATIN_FOLD_MAP = None
+
+def _fold_same_length(texte):
+    """Repli caractère par caractère (é -> e) qui conserve les positions, pour les fenêtres des lignes longues."""
+    global _LATIN_FOLD_MAP
+    if _LATIN_FOLD_MAP is None:
+        _LATIN_FOLD_MAP = {c: _fold_char(chr(c)) for c in range(0x80, 0x250) if _fold_char(chr(c)) != chr(c)}
+    return texte.translate(_LATIN_FOLD_MAP).lower()
+
+def scan_windowed_file(path, term, case_sensitive, encoding='utf-8', max_hits=0, count_only=False, accent_insensitive=False,
+                       matcher=None):
+    """Recherche par fenêtres de LONG_LINE_WINDOW caractères, pour les fichiers dont une ligne dépasse un bloc.
+    Une ligne courte donne au plus un hit, comme la lecture par lignes ; dans une ligne longue, chaque occurrence
+    est un hit (extrait). Les fenêtres se recouvrent de la longueur du terme : aucune occurrence n'est coupée.
+    Retourne [(numéro de ligne, ligne ou extrait, offset en octets)] ou le nombre de hits si count_only."""
+    if matcher: # Repli à longueur constante : les positions du texte replié restent celles du texte d'origine
+        normalize = _fold_same_length if accent_insensitive else matcher.normalize
+        needle = matcher.pattern
+        overlap = len(needle) + matcher.max_distance
+    else:
+        normalize = _fold_same_length if accent_insensitive else (lambda texte: texte) if case_sensitive else str.lower
+        needle = fold_text(term) if accent_insensitive else normalize(term)
+        overlap = len(needle) - 1
+    decoder = codecs.getincrementaldecoder(encoding)()
+    hits, hits_count = [], 0
+    texte = '' # Fenêtre courante
+    texte_offset = 0 # Offset en octets de texte[0]
+    line_no = 1 # Ligne qui contient texte[0]
+    at_line_start = True
+    with open(path, 'rb') as f:
+        while True:
+            raw = f.read(LONG_LINE_WINDOW)
+            eof = len(raw) < LONG_LINE_WINDOW # Lecture incomplète : la ligne entamée est la dernière du fichier
+            texte += decoder.decode(raw, final=eof)
+            if not texte:
+                break
+            last_nl = texte.rfind('\n')
+            if eof:
+                keep_from = len(texte) # Fin de fichier : tout traiter
+            elif last_nl != -1 and len(texte) - last_nl - 1 < LONG_LINE_WINDOW:
+                keep_from = last_nl + 1 # La ligne entamée repart entière dans la fenêtre suivante
+            else:
+                keep_from = max(0, len(texte) - overlap) # Au milieu d'une ligne longue : le recouvrement est revu ensuite
+            haystack = normalize(texte)
+            is_ascii = texte.isascii()
+            char_cursor, byte_cursor = 0, texte_offset
+            def byte_offset(i):
+                nonlocal char_cursor, byte_cursor
+                if is_ascii:
+                    return texte_offset + i
+                byte_cursor += len(texte[char_cursor:i].encode(encoding))
+                char_cursor = i
+                return byte_cursor
+            positions = matcher.iter_line_matches(haystack, once_per_line=False) if matcher else None
+            cursor, counted_upto, line_at_cursor = 0, 0, line_no
+            while True:
+                if matcher:
+                    pos = next((p for p in positions if p >= cursor), -1)
+                else:
+                    pos = haystack.find(needle, cursor)
+                if pos == -1 or pos >= keep_from: # Occurrence à cheval : retrouvée entière dans la fenêtre suivante
+                    break
+                line_at_cursor += haystack.count('\n', counted_upto, pos)
+                counted_upto = pos
+                line_start = haystack.rfind('\n', 0, pos) + 1
+                line_end = haystack.find('\n', pos)
+                complete = (line_start > 0 or at_line_start) and (line_end != -1 or eof)
+                if line_end == -1:
+                    line_end = len(texte)
+                hits_count += 1
+                if complete and line_end - line_start <= MAX_HIT_LINE_CHARS:
+                    if not count_only:
+                        hits.append((line_at_cursor, texte[line_start:line_end].strip(), byte_offset(line_start)))
+                    cursor = line_end + 1 # Une ligne courte n'est rapportée qu'une fois
+                else:
+                    if not count_only:
+                        hits.append((line_at_cursor, _excerpt(texte, pos, len(needle), line_start, line_end), byte_offset(pos)))
+                    cursor = pos + max(1, len(needle))
+                if max_hits and hits_count >= max_hits:
+                    return hits_count if count_only else hits
+            consumed = texte[:keep_from]
+            line_no += consumed.count('\n')
+            texte_offset += len(consumed) if is_ascii else len(consumed.encode(encoding))
+            if keep_from:
+                at_line_start = consumed.endswith('\n')
+            texte = texte[keep_from:]
+            if eof:
+                break
+    return hits_count if count_only else hits
+
+# --- Lignes de contexte à la demande : offset du hit ou index épars des débuts de ligne ---
+LINE_INDEX_STRIDE = 1024 # Un offset conservé toutes les N lignes (8 octets par tranche de N lignes)
+CONTEXT_BACK_WINDOW = 64 * 1024 # Fenêtre relue avant le hit pour retrouver les lignes précédentes
+DEFAULT_CONTEXT_LINES = 3
+
+def _line_index_paths(source_path):
+    name = hashlib.sha1(f"{os.path.abspath(source_path)}|lines".encode('utf-8')).hexdigest()[:24]
+    return os.path.join(INDEX_DIR, name + ".lines"), os.path.join(INDEX_DIR, name + ".lines.meta.json")
+
+def build_line_index(source_path, stride=LINE_INDEX_STRIDE):
+    """Construit l'index des débuts de ligne (lignes 1, 1+stride, 1+2*stride...) en une lecture séquentielle."""
+    index_path, meta_path = _line_index_paths(source_path)
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    st = os.stat(source_path)
+    offsets = array('Q', [0])
+    with open(source_path, 'rb') as f:
+        pos = 0
+        for line_no, (_, length) in enumerate(iter_bounded_raw_lines(f), start=1):
+            pos += length
+            if line_no % stride == 0:
+                offsets.append(pos)
+    with open(index_path, 'wb') as f:
+        offsets.tofile(f)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"source": os.path.abspath(source_path), "stride": stride, "size": st.st_size, "mtime_ns": st.st_mtime_ns}, f)
+    return offsets, stride
+
+def load_line_index(source_path):
+    """Retourne (offsets, stride), en (re)construisant l'index s'il est absent ou périmé."""
+    index_path, meta_path = _line_index_paths(source_path)
+    if os.path.exists(index_path) and _field_index_is_fresh(source_path, meta_path):
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                stride = json.load(f)["stride"]
+            offsets = array('Q')
+            with open(index_path, 'rb') as f:
+                offsets.frombytes(f.read())
+            return offsets, stride
+        except (OSError, ValueError, KeyError):
+            pass
+    return build_line_index(source_path)
+
+def _decode_context_line(raw, length=None):
+    """Ligne de contexte affichable, coupée à MAX_HIT_LINE_CHARS (length : longueur complète si raw n'en est que le début)."""
+    try:
+        texte = raw.decode('utf-8').rstrip('\r\n')
+    except UnicodeDecodeError:
+        texte = raw.decode('latin-1').rstrip('\r\n')
+    if len(texte) > MAX_HIT_LINE_CHARS or (length is not None and length > len(raw)):
+        return texte[:MAX_HIT_LINE_CHARS] + '…'
+    return texte
+
+def read_context_lines(source_path, line_number, offset=None, before=DEFAULT_CONTEXT_LINES, after=DEFAULT_CONTEXT_LINES):
+    """Retourne [(numéro, ligne)] de line_number - before à line_number + after.
+    Avec l'offset enregistré par le worker, un seek suffit ; sinon l'index des débuts de ligne positionne la lecture."""
+    with open(source_path, 'rb') as f:
+        if offset is None:
+            offsets, stride = load_line_index(source_path)
+            first = max(1, line_number - before)
+            slot = min((first - 1) // stride, len(offsets) - 1)
+            f.seek(offsets[slot])
+            for _ in range(first - 1 - slot * stride):
+                if not read_bounded_line(f)[1]:
+                    return []
+            lines = []
+            for numero in range(first, line_number + after + 1):
+                raw, length = read_bounded_line(f)
+                if not length:
+                    break
+                lines.append((numero, _decode_context_line(raw, length)))
+            return lines
+
+        previous = []
+        if before and offset:
+            window = CONTEXT_BACK_WINDOW
+            while True:
+                start = max(0, offset - window)
+                f.seek(start)
+                parts = f.read(offset - start).split(b'\n')[:-1] # Le bloc se termine par la fin de la ligne précédente
+                if start == 0 or len(parts) > before or window >= LONG_LINE_WINDOW: # La première partie peut être une ligne tronquée
+                    break
+                window *= 4
+            previous = parts[-before:]
+        f.seek(offset)
+        lines = [(line_number - len(previous) + i, _decode_context_line(raw)) for i, raw in enumerate(previous)]
+        for numero in range(line_number, line_number + after + 1):
+            raw, length = read_bounded_line(f)
+            if not length:
+                break
+            lines.append((numero, _decode_context_line(raw, length)))
+        return lines
+
+# --- Recherche insensible à la casse et aux accents : tables de repli octet -> octet ---
+FOLD_SCAN_BLOCK_SIZE = 4 * 1024 * 1024
+
+_COMBINING_MARKS_RE = re.compile('[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]+')
+
+def fold_text(texte):
+    """Repli de référence : minuscules, diacritiques retirés (é -> e, Ç -> c)."""
+    if texte.isascii():
+        return texte.lower()
+    return _COMBINING_MARKS_RE.sub('', unicodedata.normalize('NFD', texte)).lower()
+
+def _fold_char(ch):
+    folded = fold_text(ch)
+    return folded if len(folded) == 1 else ch
+
+def _build_fold_tables():
+    """Tables pour bytes.translate, dérivées de fold_text : {encodage: (table, octets supprimés)}.
+    En UTF-8, l'octet de tête 0xC3 (U+00C0-U+00FF) est supprimé et l'octet de continuation replié ;
+    les autres caractères peuvent produire de faux candidats, écartés ensuite par fold_text sur la ligne."""
+    cp1252 = bytearray(range(256))
+    for b in range(256):
+        try:
+            folded = _fold_char(bytes([b]).decode('cp1252')).encode('cp1252')
+        except UnicodeError:
+            continue # Octet non défini en cp1252, ou repli non représentable
+        if len(folded) == 1:
+            cp1252[b] = folded[0]
+    utf8 = bytearray(range(256))
+    for b in range(0x41, 0x5B):
+        utf8[b] = b + 0x20
+    for b in range(0x80, 0xC0):
+        folded = ord(_fold_char(chr(0xC0 + b - 0x80)))
+        if folded < 0x80:
+            utf8[b] = folded
+        elif 0xC0 <= folded <= 0xFF:
+            utf8[b] = 0x80 + folded - 0xC0
+    return {'utf-8': (bytes(utf8), b'\xc3'), 'cp1252': (bytes(cp1252), b'')}
+
+FOLD_TABLES = _build_fold_tables()
+
+# Octets de tête UTF-8 des caractères au-delà de U+00FF (cyrillique, grec, Latin étendu...) : les tables ne les replient pas
+_UTF8_BEYOND_LATIN1_RE = re.compile(rb'[\xc4-\xf4]')
+
+_UTF8_NOT_BEYOND_LATIN1 = bytes(range(0xc4)) + bytes(range(0xf5, 0x100)) # Pour compter les octets de tête au-delà de U+00FF
+
+def _scan_folded_text(raw, term_folded, max_hits=0, count_only=False):
+    """Repli de référence (fold_text) sur le bloc décodé, pour les blocs UTF-8 majoritairement hors de portée des tables.
+    Même résultat que scan_folded_buffer."""
+    texte = raw.decode('utf-8')
+    haystack = fold_text(texte) # Ne touche pas aux sauts de ligne : les index de ligne restent alignés
+    hits = []
+    hits_count = 0
+    line_cursor, byte_cursor = 0, 0 # Offset du début de la ligne line_cursor dans raw
+    for line_idx, ligne in iter_lines_at(texte, haystack, iter_exact_line_matches(haystack, term_folded)):
+        hits_count += 1
+        if not count_only:
+            while line_cursor < line_idx:
+                byte_cursor = raw.index(b'\n', byte_cursor) + 1
+                line_cursor += 1
+            hits.append((line_idx, clip_hit_line(ligne.strip(), term_folded, _fold_same_length), byte_cursor))
+        if max_hits and hits_count >= max_hits:
+            break
+    return raw.count(b'\n'), (hits_count if count_only else hits)
+
+def _scan_beyond_latin1_lines(raw, term_folded):
+    """Vérifie par fold_text les seules lignes d'un bloc UTF-8 contenant des caractères au-delà de U+00FF,
+    hors de portée des tables. Retourne (offsets de début de ces lignes, [(index de ligne, ligne, offset)])."""
+    starts = set()
+    hits = []
+    line_idx, counted_upto = 0, 0
+    m = _UTF8_BEYOND_LATIN1_RE.search(raw)
+    while m:
+        line_start = raw.rfind(b'\n', 0, m.start()) + 1
+        line_end = raw.find(b'\n', m.start())
+        line_idx += raw.count(b'\n', counted_upto, line_start)
+        counted_upto = line_start
+        starts.add(line_start)
+        ligne = raw[line_start:line_end if line_end != -1 else len(raw)].decode('utf-8', 'replace')
+        if term_folded in fold_text(ligne):
+            hits.append((line_idx, clip_hit_line(ligne.strip(), term_folded, _fold_same_length), line_start))
+        if line_end == -1:
+            break
+        m = _UTF8_BEYOND_LATIN1_RE.search(raw, line_end + 1)
+    return starts, hits
+
+def scan_folded_buffer(raw, term, max_hits=0, count_only=False):
+    """Recherche repliée sur un tampon de lignes complètes : un bytes.translate sur tout le tampon,
+    puis vérification des seules lignes candidates. Un bloc UTF-8 contenant des caractères au-delà de U+00FF,
+    hors de portée des tables, voit ces lignes-là vérifiées par fold_text (_scan_beyond_latin1_lines),
+    ou tout le bloc replié par fold_text (_scan_folded_text) quand ces caractères y sont nombreux.
+    Retourne (sauts de ligne, [(index de ligne, ligne, offset)]), ou (sauts de ligne, nombre de lignes trouvées) si count_only."""
+    encoding = 'utf-8'
+    if not raw.isascii():
+        try:
+            raw.decode('utf-8')
+        except UnicodeDecodeError:
+            encoding = 'cp1252'
+    term_folded = fold_text(term)
+    beyond_starts, beyond_hits = set(), []
+    if encoding == 'utf-8' and _UTF8_BEYOND_LATIN1_RE.search(raw):
+        if len(raw.translate(None, _UTF8_NOT_BEYOND_LATIN1)) * 8 > raw.count(b'\n'): # Plus d'un par 8 lignes : boucle par ligne trop coûteuse
+            return _scan_folded_text(raw, term_folded, max_hits, count_only)
+        beyond_starts, beyond_hits = _scan_beyond_latin1_lines(raw, term_folded)
+    table_max_hits = 0 if beyond_starts else max_hits # Fusion par offset ensuite : pas d'arrêt anticipé
+    table, delete = FOLD_TABLES[encoding]
+    newlines = raw.count(b'\n')
+    try:
+        needle = term_folded.encode(encoding).translate(table, delete)
+    except UnicodeEncodeError:
+        needle = None # Terme non représentable : seules les lignes vérifiées par fold_text peuvent correspondre
+    folded = raw.translate(table, delete) if delete else raw.translate(table)
+
+    hits = []
+    hits_count = 0
+    line_idx, counted_upto = 0, 0
+    folded_cursor, raw_cursor = 0, 0 # Positions alignées (débuts de ligne) entre tampon replié et original
+    pos = folded.find(needle) if needle else -1
+    while pos != -1:
+        line_idx += folded.count(b'\n', counted_upto, pos)
+        folded_start = folded.rfind(b'\n', 0, pos) + 1
+        raw_start = raw_cursor + folded_start - folded_cursor
+        if delete: # Retrouver l'offset d'origine : point fixe sur le nombre d'octets supprimés
+            while True:
+                candidate = raw_cursor + folded_start - folded_cursor + raw.count(delete, raw_cursor, raw_start) # Un seul octet supprimé
+                if candidate == raw_start:
+                    break
+                raw_start = candidate
+        folded_cursor, raw_cursor = folded_start, raw_start
+        raw_end = raw.find(b'\n', raw_start)
+        ligne = raw[raw_start:raw_end if raw_end != -1 else len(raw)].decode(encoding, 'replace')
+        if raw_start not in beyond_starts and term_folded in fold_text(ligne):
+            hits_count += 1
+            if not count_only or beyond_starts:
+                hits.append((line_idx, clip_hit_line(ligne.strip(), term_folded, _fold_same_length), raw_start))
+            if table_max_hits and hits_count >= table_max_hits:
+                break
+        next_nl = folded.find(b'\n', pos)
+        if next_nl == -1:
+            break
+        counted_upto = next_nl + 1
+        line_idx += 1
+        pos = folded.find(needle, counted_upto)
+    if beyond_starts:
+        hits = sorted(hits + beyond_hits, key=lambda hit: hit[2])
+        if max_hits:
+            hits = hits[:max_hits]
+        hits_count = len(hits)
+    return newlines, (hits_count if count_only else hits)
+
+def scan_folded_file(path, term, max_hits=0, count_only=False):
+    """scan_folded_buffer appliqué à un fichier, par blocs de lignes complètes ; LongLineError si une ligne dépasse un bloc.
+    Retourne [(numéro de ligne, ligne, offset)] ou le nombre de lignes trouvées si count_only."""
+    hits, hits_count, line_base, offset_base = [], 0, 0, 0
+    carry = b''
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(FOLD_SCAN_BLOCK_SIZE)
+            data = carry + chunk
+            if not data:
+                break
+            last = len(chunk) < FOLD_SCAN_BLOCK_SIZE # Lecture incomplète : fin de fichier, le reliquat est la dernière ligne
+            cut = len(data) if last else data.rfind(b'\n') + 1
+            if not cut:
+                raise LongLineError(f"ligne de plus de {FOLD_SCAN_BLOCK_SIZE} octets") # Relire par fenêtres (scan_windowed_file)
+            block, carry = data[:cut], data[cut:]
+            newlines, found = scan_folded_buffer(block, term, max_hits - hits_count if max_hits else 0, count_only)
+            if count_only:
+                hits_count += found
+            else:
+                hits.extend((line_base + idx + 1, ligne, offset_base + offset) for idx, ligne, offset in found)
+                hits_count = len(hits)
+            line_base += newlines
+            offset_base += cut
+            if last or (max_hits and hits_count >= max_hits):
+                break
+    return hits_count if count_only else hits
+
+# --- Recherche approchée (fautes de frappe) : filtre exact par morceaux + vérification bit-parallèle ---
+DEFAULT_FUZZY_DISTANCE = 1
+MAX_FUZZY_DISTANCE = 3
+
+class FuzzyMatcher:
+    """Trouve les lignes contenant le terme à au plus max_distance éditions près (insertion, suppression, substitution).
+    Principe des tiroirs : le motif est coupé en max_distance + 1 morceaux de même longueur, dont au moins un
+    apparaît intact dans toute occurrence approchée. Seules les fenêtres autour de ces morceaux sont vérifiées
+    par l'algorithme bit-parallèle de Myers (une itération par caractère, quelle que soit la longueur du motif)."""
+    def __init__(self, term, max_distance, case_sensitive=False, accent_insensitive=False):
+        if accent_insensitive:
+            self.normalize = fold_text
+        elif case_sensitive:
+            self.normalize = lambda texte: texte
+        else:
+            self.normalize = str.lower
+        self.pattern = self.normalize(term)
+        m = len(self.pattern)
+        self.max_distance = max(0, min(max_distance, m - 1)) # À m éditions, n'importe quel texte correspondrait
+        q = m // (self.max_distance + 1) if m else 0
+        self.piece_offsets = {} # morceau -> (premier offset, dernier offset) dans le motif
+        for i in range(self.max_distance + 1):
+            piece = self.pattern[i * q:(i + 1) * q]
+            first, last = self.piece_offsets.get(piece, (i * q, i * q))
+            self.piece_offsets[piece] = (min(first, i * q), max(last, i * q))
+        self.peq = {}
+        for i, c in enumerate(self.pattern):
+            self.peq[c] = self.peq.get(c, 0) | (1 << i)
+
+    def _myers_within(self, text, start, end):
+        """Vrai si une sous-chaîne de text[start:end] est à au plus max_distance du motif (Myers 1999, Hyyrö)."""
+        m = len(self.pattern)
+        full = (1 << m) - 1
+        last = 1 << (m - 1)
+        pv, mv, score = full, 0, m
+        peq = self.peq
+        for c in text[start:end]:
+            eq = peq.get(c, 0)
+            xv = eq | mv
+            xh = (((eq & pv) + pv) ^ pv) | eq
+            ph = mv | ~(xh | pv)
+            mh = pv & xh
+            if ph & last:
+                score += 1
+            elif mh & last:
+                score -= 1
+                if score <= self.max_distance:
+                    return True
+            ph = (ph << 1) & full # Début libre : pas de report de 1 (recherche et non comparaison globale)
+            mh = (mh << 1) & full
+            pv = (mh | ~(xv | ph)) & full
+            mv = ph & xv
+        return score <= self.max_distance
+
+    def iter_line_matches(self, haystack, once_per_line=True):
+        """Pour chaque ligne correspondante de haystack (déjà normalisé), la position du morceau validé.
+        Chaque morceau est cherché par str.find ; sa prochaine occurrence est mémorisée pour ne parcourir le bloc qu'une fois.
+        Avec once_per_line=False, toutes les occurrences sont rapportées (lignes longues parcourues par fenêtres)."""
+        if not self.piece_offsets or not len(next(iter(self.piece_offsets))):
+            return
+        m, k = len(self.pattern), self.max_distance
+        next_pos = {piece: haystack.find(piece) for piece in self.piece_offsets}
+        while True:
+            piece, pos = min(((p, i) for p, i in next_pos.items() if i != -1), key=lambda item: item[1], default=(None, -1))
+            if pos == -1:
+                return
+            first, last = self.piece_offsets[piece]
+            line_start = haystack.rfind('\n', 0, pos) + 1
+            line_end = haystack.find('\n', pos)
+            if line_end == -1:
+                line_end = len(haystack)
+            if self._myers_within(haystack, max(line_start, pos - last - k), min(line_end, pos - first + m + k)):
+                yield pos
+                resume = line_end + 1 if once_per_line else pos - first + m + k + 1 # Sinon : après la fenêtre validée
+            else:
+                resume = pos + 1
+            for p, i in next_pos.items():
+                if i != -1 and i < resume:
+                    next_pos[p] = haystack.find(p, resume)
+
+    def iter_matching_lines(self, texte):
+        """(index de ligne, ligne) des lignes correspondantes d'un bloc de lignes complètes, en une passe sur le bloc."""
+        haystack = self.normalize(texte)
+        return iter_lines_at(texte, haystack, self.iter_line_matches(haystack))
+
+    def matches(self, ligne):
+        return next(self.iter_line_matches(self.normalize(ligne)), None) is not None
+
+_fuzzy_matchers = {} # Cache par processus de scan
+
+def _get_fuzzy_matcher(term, max_distance, case_sensitive, accent_insensitive):
+    key = (term, max_distance, case_sensitive, accent_insensitive)
+    matcher = _fuzzy_matchers.get(key)
+    if matcher is None:
+        matcher = _fuzzy_matchers[key] = FuzzyMatcher(term, max_distance, case_sensitive, accent_insensitive)
+    return matcher
+
+# --- Lecteurs de sources structurées : SQLite (lignes des tables) et NDJSON (valeurs texte uniquement) ---
+# Un lecteur renvoie [(numéro, contenu, offset)] ou un compte, comme scan_folded_file ; numéro = rowid pour SQLite,
+# numéro de ligne pour NDJSON. Les anomalies non bloquantes vont dans errors. SOURCE_READERS associe une extension à son lecteur.
+_LIKE_ESCAPE_RE = re.compile(r'([\\%_])')
+
+def _make_value_predicate(term, case_sensitive, accent_insensitive, fuzzy_distance):
+    """Test appliqué à une valeur texte, avec la même sémantique que la recherche dans les lignes."""
+    if fuzzy_distance:
+        return _get_fuzzy_matcher(term, fuzzy_distance, case_sensitive, accent_insensitive).matches
+    if accent_insensitive:
+        folded = fold_text(term)
+        return lambda value: folded in fold_text(value)
+    if case_sensitive:
+        return lambda value: term in value
+    lowered = term.lower()
+    return lambda value: lowered in value.lower()
+
+def _quote_sql_identifier(name):
+    return '"' + name.replace('"', '""') + '"'
+
+def _sqlite_pushdown(table, columns, term, case_sensitive, accent_insensitive, fuzzy_distance, fts_trigram):
+    """Clause WHERE qui réduit les lignes lues par SQLite ; toujours vérifiée ensuite en Python.
+    None si aucun filtre sûr n'existe (accents, recherche approchée, casse non ASCII)."""
+    if fuzzy_distance or accent_insensitive:
+        return None
+    if fts_trigram and len(term) >= 3:
+        # Tokenizer trigram : MATCH sur une phrase = sous-chaîne, insensible à la casse
+        return f"{_quote_sql_identifier(table)} MATCH ?", ['"' + term.replace('"', '""') + '"']
+    if case_sensitive:
+        return " OR ".join(f"instr({_quote_sql_identifier(col)}, ?) > 0" for col in columns), [term] * len(columns)
+    if not term.isascii():
+        return None # LIKE ne replie la casse que pour l'ASCII : 'É' ne trouverait pas 'é'
+    pattern = '%' + _LIKE_ESCAPE_RE.sub(r'\\\1', term) + '%'
+    return " OR ".join(f"{_quote_sql_identifier(col)} LIKE ? ESCAPE '\\'" for col in columns), [pattern] * len(columns)
+
+SQLITE_FTS_SHADOW_SUFFIXES = ("data", "idx", "content", "docsize", "config", # FTS5
+                              "segments", "segdir", "stat") # FTS3/4
+
+def read_sqlite_hits(path, term, case_sensitive, accent_insensitive=False, fuzzy_distance=0, max_hits=0, count_only=False, errors=None):
+    """Parcourt les tables d'une base SQLite (lecture seule). Un hit = une ligne dont une valeur texte contient le terme,
+    affichée 'table#rowid: colonne=valeur | ...'. Les tables internes (sqlite_*, index FTS) sont ignorées."""
+    import sqlite3
+    from urllib.request import pathname2url
+    predicate = _make_value_predicate(term, case_sensitive, accent_insensitive, fuzzy_distance)
+    hits = []
+    count = 0
+    conn = sqlite3.connect(f"file:{pathname2url(os.path.abspath(path))}?mode=ro", uri=True)
+    try:
+        conn.text_factory = lambda raw: raw.decode('utf-8', errors='replace')
+        tables = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name").fetchall()
+        shadow_tables = {f"{name}_{suffix}" for name, sql in tables if (sql or '').upper().startswith('CREATE VIRTUAL TABLE')
+                         for suffix in SQLITE_FTS_SHADOW_SUFFIXES}
+        for table, sql in tables:
+            if table in shadow_tables:
+                continue # Tables de stockage d'un index FTS : leur contenu est déjà dans la table virtuelle
+            sql_upper = (sql or '').upper()
+            columns = [row[1] for row in conn.execute(f"PRAGMA table_info({_quote_sql_identifier(table)})")]
+            if not columns:
+                continue
+            without_rowid = 'WITHOUT ROWID' in sql_upper
+            select = ", ".join(_quote_sql_identifier(col) for col in columns)
+            query = f"SELECT {'NULL' if without_rowid else 'rowid'}, {select} FROM {_quote_sql_identifier(table)}"
+            pushdown = _sqlite_pushdown(table, columns, term, case_sensitive, accent_insensitive, fuzzy_distance,
+                                        'FTS5' in sql_upper and 'TRIGRAM' in sql_upper)
+            params = []
+            if pushdown:
+                query += " WHERE " + pushdown[0]
+                params = pushdown[1]
+            for ordinal, row in enumerate(conn.execute(query, params), start=1):
+                values = row[1:]
+                if not any(isinstance(value, (str, int, float)) and predicate(str(value)) for value in values):
+                    continue
+                count += 1
+                if not count_only:
+                    row_id = ordinal if without_rowid else row[0] # Sans rowid : rang dans la table
+                    contenu = " | ".join(f"{col}={' '.join(str(value).splitlines())}" for col, value in zip(columns, values)
+                                         if value is not None and not isinstance(value, bytes)) # Une ligne par hit dans la zone de résultats
+                    hits.append((row_id, f"{table}#{row_id}: {contenu}", None))
+                if max_hits and count >= max_hits:
+                    return count if count_only else hits
+    finally:
+        conn.close()
+    return count if count_only else hits
+
+def _json_string_values(value):
+    """Valeurs texte d'un document JSON, à toute profondeur (les clés et les nombres ne sont pas recherchés)."""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _json_string_values(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _json_string_values(item)
+
+MAX_NDJSON_LINE_BYTES = 16 * LONG_LINE_WINDOW # Un document doit être chargé entier pour être décodé
+
+def read_ndjson_hits(path, term, case_sensitive, accent_insensitive=False, fuzzy_distance=0, max_hits=0, count_only=False, errors=None):
+    """Un document JSON par ligne : hit si une valeur texte contient le terme. Les lignes gardent leur numéro
+    et leur offset, le contexte fonctionne comme pour un fichier texte. Les lignes invalides sont comptées à part."""
+    predicate = _make_value_predicate(term, case_sensitive, accent_insensitive, fuzzy_distance)
+    # Préfiltre sur la ligne brute, sauf si le terme peut y être échappé (é, \") ou replié
+    raw_term = None
+    if not fuzzy_distance and not accent_insensitive and term.isascii() and '"' not in term and '\\' not in term:
+        raw_term = (term if case_sensitive else term.lower()).encode('ascii')
+    hits = []
+    count = 0
+    invalid_lines = oversized_lines = 0
+    offset = 0
+    with open(path, 'rb') as f:
+        for index, (raw_line, length) in enumerate(iter_bounded_raw_lines(f, MAX_NDJSON_LINE_BYTES), start=1):
+            line_offset = offset
+            offset += length
+            if length > len(raw_line): # Document démesuré : non chargé, pour garder la mémoire du worker bornée
+                oversized_lines += 1
+                continue
+            if raw_term is not None and b'\\' not in raw_line:
+                if raw_term not in (raw_line if case_sensitive else raw_line.lower()):
+                    continue
+            if not raw_line.strip():
+                continue
+            try:
+                document = json.loads(raw_line)
+            except ValueError:
+                invalid_lines += 1
+                continue
+            if not any(predicate(value) for value in _json_string_values(document)):
+                continue
+            count += 1
+            if not count_only:
+                hits.append((index, clip_hit_line(raw_line.decode('utf-8', errors='replace').strip(), term.lower()), line_offset))
+            if max_hits and count >= max_hits:
+                break
+    if invalid_lines and errors is not None:
+        errors.append(f"{os.path.basename(path)}: {invalid_lines} ligne(s) JSON invalide(s) ignorée(s)")
+    if oversized_lines and errors is not None:
+        errors.append(f"{os.path.basename(path)}: {oversized_lines} ligne(s) de plus de {MAX_NDJSON_LINE_BYTES // (1024 * 1024)} Mo ignorée(s)")
+    return count if count_only else hits
+
+SOURCE_READERS = {'.db': read_sqlite_hits, '.sqlite': read_sqlite_hits, '.sqlite3': read_sqlite_hits,
+                  '.ndjson': read_ndjson_hits, '.jsonl': read_ndjson_hits}
+SOURCE_READER_EXTENSIONS = tuple(SOURCE_READERS)
+
+def source_reader_for(path):
+    """Lecteur dédié au fichier d'après son extension, ou None pour la lecture texte habituelle."""
+    return SOURCE_READERS.get(os.path.splitext(path)[1].lower())
+
+# --- Transport des hits : enregistrements binaires, décodés à la lecture ---
+# Un hit = en-tête (id de fichier, numéro de ligne, offset en octets ou -1, longueur du contenu) + contenu UTF-8.
+# Un lot se transmet du worker au parent comme un seul bytes : pas d'objet Python par hit à sérialiser.
+_HIT_RECORD = struct.Struct('<IQqI')
+
+class HitBatch:
+    """Séquence de hits (fichier, ligne, contenu, offset) stockés en enregistrements binaires.
+    Seuls les hits parcourus sont décodés : compter, tronquer ou concaténer des lots ne décode rien.
+    Un lot est une suite de segments (chemins, données, nombre de hits, base des lignes, base des offsets)."""
+    __slots__ = ('_segments', '_count')
+
+    def __init__(self, segments=()):
+        self._segments = list(segments)
+        self._count = sum(segment[2] for segment in self._segments)
+
+    @classmethod
+    def pack(cls, hits):
+        """Lot à partir de tuples (fichier, ligne, contenu, offset)."""
+        ids, parts = {}, []
+        for fichier, ligne, contenu, offset in hits:
+            file_id = ids.setdefault(fichier, len(ids))
+            payload = contenu.encode('utf-8', 'surrogatepass')
+            parts.append(_HIT_RECORD.pack(file_id, ligne, -1 if offset is None else offset, len(payload)))
+            parts.append(payload)
+        return cls([(tuple(ids), b''.join(parts), len(parts) // 2, 0, 0)]) if parts else cls()
+
+    @classmethod
+    def pack_block(cls, hits):
+        """Lot à partir des tuples (index de ligne, contenu, offset) d'un bloc, dont le fichier n'est pas encore connu."""
+        return cls.pack((None, ligne, contenu, offset) for ligne, contenu, offset in hits)
+
+    def rebased(self, path, line_base, offset_base):
+        """Hits d'un bloc replacés dans leur fichier (les données ne sont pas recopiées)."""
+        return HitBatch([((path,), data, count, base + line_base, offset + offset_base)
+                         for _, data, count, base, offset in self._segments])
+
+    def extend(self, other):
+        self._segments.extend(other._segments)
+        self._count += len(other)
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        unpack_from, header_size = _HIT_RECORD.unpack_from, _HIT_RECORD.size
+        for paths, data, count, line_base, offset_base in self._segments:
+            pos = 0
+            for _ in range(count):
+                file_id, ligne, offset, length = unpack_from(data, pos)
+                pos += header_size
+                contenu = data[pos:pos + length].decode('utf-8', 'surrogatepass')
+                pos += length
+                yield paths[file_id], ligne + line_base, contenu, None if offset < 0 else offset + offset_base
+
+    def __getitem__(self, index):
+        """Un hit (seul lui est décodé, les précédents sont sautés par leur en-tête) ou une tranche [:n],
+        qui tronque le lot sans rien décoder."""
+        if isinstance(index, int):
+            if index < 0:
+                index += self._count
+            if not 0 <= index < self._count:
+                raise IndexError("indice de hit hors limites")
+            for paths, data, count, line_base, offset_base in self._segments:
+                if index >= count:
+                    index -= count
+                    continue
+                pos = 0
+                for _ in range(index):
+                    pos += _HIT_RECORD.size + _HIT_RECORD.unpack_from(data, pos)[3]
+                file_id, ligne, offset, length = _HIT_RECORD.unpack_from(data, pos)
+                pos += _HIT_RECORD.size
+                contenu = data[pos:pos + length].decode('utf-8', 'surrogatepass')
+                return paths[file_id], ligne + line_base, contenu, None if offset < 0 else offset + offset_base
+        if not isinstance(index, slice) or index.start or index.step:
+            raise TypeError("HitBatch ne prend en charge que les tranches [:n]")
+        remaining = self._count if index.stop is None else max(0, index.stop if index.stop >= 0 else self._count + index.stop)
+        segments = []
+        for paths, data, count, line_base, offset_base in self._segments:
+            if remaining <= 0:
+                break
+            segments.append((paths, data, min(count, remaining), line_base, offset_base))
+            remaining -= count
+        return HitBatch(segments)
+
+    def __reduce__(self):
+        return HitBatch, (self._segments,)
+
+# --- Lecture anticipée : threads d'E/S -> mémoire partagée -> processus de scan ---
+READ_AHEAD_BLOCK_SIZE = 8 * 1024 * 1024 # Taille d'un bloc lu séquentiellement
+READ_AHEAD_IO_THREADS = 2 # Peu de threads : la lecture doit rester séquentielle
+DEFAULT_PREFETCH_DEPTH = 8 # Nombre de blocs en vol (lus et pas encore scannés)
+MAX_PREFETCH_DEPTH = 256 # Borne du réglage dans l'interface
+
+_attached_shared_blocks = {} # Cache par processus de scan : nom -> SharedMemory
+_ATTACHED_BLOCKS_MAX = 64 # Un pool qui survit aux recherches (service local) verrait passer des tampons sans fin
+
+def _scan_shared_block(shm_name, length, batabase_term, case_sensitive, max_hits=0, count_only=False, accent_insensitive=False,
+                       fuzzy_distance=0):
+    """Scanne un bloc de lignes complètes directement dans la mémoire partagée (sans copie des octets).
+    Retourne (nombre de sauts de ligne du bloc, HitBatch des (index de ligne dans le bloc, ligne, offset dans le bloc)),
+    ou (sauts de ligne, nombre de lignes trouvées) si count_only."""
+    shm = _attached_shared_blocks.get(shm_name)
+    if shm is None:
+        shm = _attached_shared_blocks[shm_name] = shared_memory.SharedMemory(name=shm_name)
+        if len(_attached_shared_blocks) > _ATTACHED_BLOCKS_MAX:
+            _attached_shared_blocks.pop(next(iter(_attached_shared_blocks))).close() # Le plus ancien
+    view = shm.buf[:length]
+    if accent_insensitive and not fuzzy_distance:
+        try:
+            raw = bytes(view) # bytes.translate exige un objet bytes
+        finally:
+            view.release()
+        newlines, found = scan_folded_buffer(raw, batabase_term, max_hits, count_only)
+        return newlines, (found if count_only else HitBatch.pack_block(found))
+    try:
+        try:
+            texte, encoding = str(view, 'utf-8'), 'utf-8'
+        except UnicodeDecodeError:
+            texte, encoding = str(view, 'latin-1'), 'latin-1'
+    finally:
+        view.release()
+
+    if fuzzy_distance:
+        matcher = _get_fuzzy_matcher(batabase_term, fuzzy_distance, case_sensitive, accent_insensitive)
+        haystack = matcher.normalize(texte)
+        line_matches = matcher.iter_line_matches(haystack)
+        find_next = lambda text, start: next(line_matches, -1) # Une position par ligne, dans l'ordre
+        term, normalize = matcher.pattern, matcher.normalize
+    else:
+        normalize = (lambda texte: texte) if case_sensitive else str.lower
+        haystack = normalize(texte)
+        term = normalize(batabase_term)
+        find_next = lambda text, start: text.find(term, start)
+    hits = []
+    hits_count = 0
+    pos = find_next(haystack, 0)
+    if pos != -1:
+        lignes = None if count_only else texte.split('\n')
+        is_ascii = texte.isascii() # Positions en caractères = offsets en octets, y compris dans haystack
+        line_idx, counted_upto = 0, 0
+        offset_line, char_pos, byte_pos = 0, 0, 0 # Dernière ligne dont l'offset a été calculé
+        while pos != -1:
+            line_idx += haystack.count('\n', counted_upto, pos)
+            hits_count += 1
+            if not count_only:
+                if is_ascii:
+                    byte_pos = haystack.rfind('\n', 0, pos) + 1
+                else:
+                    line_start = char_pos + sum(len(l) + 1 for l in lignes[offset_line:line_idx])
+                    byte_pos += len(texte[char_pos:line_start].encode(encoding))
+                    char_pos, offset_line = line_start, line_idx
+                hits.append((line_idx, clip_hit_line(lignes[line_idx].strip(), term, normalize), byte_pos))
+            if max_hits and hits_count >= max_hits:
+                break
+            next_nl = haystack.find('\n', pos)
+            if next_nl == -1:
+                break
+            counted_upto = next_nl + 1
+            line_idx += 1
+            pos = find_next(haystack, counted_upto)
+    return texte.count('\n'), (hits_count if count_only else HitBatch.pack_block(hits))
+
+class _PipelinedFile:
+    """État d'un fichier découpé en blocs : intègre les blocs dans l'ordre pour numéroter les lignes.
+    Le préfixe contigu déjà scanné (offset, lignes, hits) peut être signalé à on_progress (points de reprise)."""
+    def __init__(self, path, future, hits_limit=0, count_only=False, start_offset=0, start_line=0,
+                 prior_hits=None, prior_count=0, on_progress=None):
+        self.path = path
+        self.future = future
+        self.hits_limit = hits_limit
+        self.count_only = count_only
+        self.start_offset = start_offset
+        self.on_progress = on_progress
+        self.resultats = HitBatch.pack(prior_hits or [])
+        self.count = prior_count
+        self.hits_seen = prior_count if count_only else len(self.resultats) # Pour arrêter la lecture dès que la limite est atteinte
+        self.line_base = start_line
+        self.block_results = {} # seq -> (sauts de ligne, hits, offset de début, offset de fin) ou None si le bloc a échoué
+        self.next_seq = 0 # Premier bloc pas encore intégré au préfixe contigu
+        self.prefix_broken = False # Un bloc en échec : le préfixe n'est plus un point de reprise fiable
+        self.whole_file = None # Future du fichier relu entier (ligne plus longue qu'un bloc) : remplace les blocs
+        self.blocks_submitted = 0
+        self.reading_done = False
+        self.finished = False
+        self.errors = []
+        self.lock = threading.Lock()
+
+    def block_done(self, seq, result):
+        with self.lock:
+            self.block_results[seq] = result
+            if result is not None:
+                self.hits_seen += result[1] if self.count_only else len(result[1])
+            new_hits, new_count, prefix_end = HitBatch(), 0, None
+            while self.next_seq in self.block_results:
+                block = self.block_results.pop(self.next_seq)
+                self.next_seq += 1
+                if block is None:
+                    self.prefix_broken = True
+                    continue
+                newlines, hits, block_offset, end_offset = block
+                if self.count_only:
+                    new_count += hits
+                else:
+                    new_hits.extend(hits.rebased(self.path, self.line_base + 1, block_offset))
+                self.line_base += newlines
+                prefix_end = end_offset
+            self.resultats.extend(new_hits)
+            self.count += new_count
+            if self.on_progress and prefix_end is not None and not self.prefix_broken:
+                self.on_progress(self.path, prefix_end, self.line_base, new_hits, new_count)
+        self.maybe_finish()
+
+    def maybe_finish(self):
+        with self.lock:
+            if self.finished or not self.reading_done or self.next_seq < self.blocks_submitted:
+                return
+            if self.whole_file is not None and not self.whole_file.done():
+                return
+            self.finished = True
+        if self.future.cancelled():
+            return # Recherche annulée : personne n'attend plus ce fichier
+        if self.whole_file is not None:
+            try:
+                found, errors = self.whole_file.result()
+            except Exception as e:
+                found, errors = (0 if self.count_only else HitBatch()), [f"Erreur scan {os.path.basename(self.path)}: {str(e)}"]
+            self.future.set_result((found, self.errors + errors))
+            return
+        if self.count_only:
+            self.future.set_result((min(self.count, self.hits_limit) if self.hits_limit else self.count, self.errors))
+            return
+        if self.hits_limit:
+            self.resultats = self.resultats[:self.hits_limit] # Les blocs sont intégrés dans l'ordre : on garde les premiers hits
+        self.future.set_result((self.resultats, self.errors))
+
+    def limit_reached(self):
+        return bool(self.hits_limit) and self.hits_seen >= self.hits_limit
+
+class ReadAheadPipeline:
+    """Quelques threads lisent de gros blocs séquentiels dans des tampons SharedMemory ;
+    les processus du pool les scannent sur place. La profondeur de prefetch borne la mémoire."""
+    def __init__(self, executor, batabase_term, case_sensitive, prefetch_depth=DEFAULT_PREFETCH_DEPTH,
+                 block_size=READ_AHEAD_BLOCK_SIZE, io_threads=READ_AHEAD_IO_THREADS, output_mode="lines", max_hits_per_file=0,
+                 accent_insensitive=False, fuzzy_distance=0):
+        self.executor = executor
+        self.batabase_term = batabase_term
+        self.case_sensitive = case_sensitive
+        self.accent_insensitive = accent_insensitive
+        self.fuzzy_distance = fuzzy_distance
+        self.output_mode = output_mode
+        self.max_hits_per_file = max_hits_per_file
+        self.count_only = output_mode == "count"
+        self.hits_limit = 1 if output_mode == "files" else max_hits_per_file
+        self.cancelled = False
+        self.block_size = block_size
+        self.slots = [shared_memory.SharedMemory(create=True, size=block_size) for _ in range(max(1, prefetch_depth))]
+        self.free_slots = queue.Queue()
+        for slot_index in range(len(self.slots)):
+            self.free_slots.put(slot_index)
+        self.file_queue = queue.Queue()
+        self.io_threads = [threading.Thread(target=self._io_loop, daemon=True) for _ in range(max(1, io_threads))]
+        for t in self.io_threads:
+            t.start()
+
+    def submit_file(self, path, resume=None, on_progress=None):
+        """Planifie la lecture d'un fichier ; la Future renvoie (résultats, erreurs) comme _recherche_DB_internal.
+        resume : dict {"offset", "lines", "hits", "count"} pour reprendre un fichier partiellement scanné."""
+        future = Future()
+        resume = resume or {}
+        self.file_queue.put(_PipelinedFile(path, future, self.hits_limit, self.count_only,
+                                           start_offset=resume.get("offset", 0), start_line=resume.get("lines", 0),
+                                           prior_hits=[(path, ligne, contenu, offset) for ligne, contenu, offset in resume.get("hits", [])],
+                                           prior_count=resume.get("count", 0), on_progress=on_progress))
+        return future
+
+    def cancel(self):
+        """Arrête les lectures en cours : les fichiers restants sont rendus sans résultat."""
+        self.cancelled = True
+
+    def close(self):
+        for _ in self.io_threads:
+            self.file_queue.put(None)
+        for t in self.io_threads:
+            t.join()
+        for _ in self.slots:
+            self.free_slots.get() # Attendre les blocs encore en cours de scan (le pool peut survivre au pipeline)
+        for shm in self.slots:
+            shm.close()
+            shm.unlink()
+
+    def _io_loop(self):
+        while True:
+            state = self.file_queue.get()
+            if state is None:
+                return
+            try:
+                if not self.cancelled:
+                    self._read_file(state)
+            except Exception as e:
+                state.errors.append(f"Erreur lecture {os.path.basename(state.path)}: {str(e)}")
+            with state.lock:
+                state.reading_done = True
+            state.maybe_finish()
+
+    def _read_file(self, state):
+        carry = b''
+        block_start = state.start_offset # Offset absolu du premier octet du tampon (reliquat compris)
+        with open(state.path, 'rb') as f:
+            if block_start:
+                f.seek(block_start)
+            while not self.cancelled and not state.limit_reached():
+                slot_index = self.free_slots.get() # Bloque si tous les tampons sont en vol (backpressure)
+                buf = self.slots[slot_index].buf
+                buf[:len(carry)] = carry
+                try:
+                    n = f.readinto(buf[len(carry):self.block_size])
+                except Exception:
+                    self.free_slots.put(slot_index)
+                    raise
+                total = len(carry) + n
+                if total == 0:
+                    self.free_slots.put(slot_index)
+                    return
+                last = n < self.block_size - len(carry) # Lecture incomplète : fin de fichier, le reliquat est le dernier bloc
+                cut = total
+                if not last:
+                    # Couper après le dernier saut de ligne : chaque bloc ne contient que des lignes complètes
+                    cut = 0
+                    search_end = total
+                    while search_end > 0:
+                        search_start = max(0, search_end - 65536)
+                        last_nl = bytes(buf[search_start:search_end]).rfind(b'\n')
+                        if last_nl != -1:
+                            cut = search_start + last_nl + 1
+                            break
+                        search_end = search_start
+                    if not cut: # Aucun saut de ligne dans tout un bloc plein : ligne plus longue qu'un bloc
+                        self.free_slots.put(slot_index)
+                        self._scan_whole_file(state)
+                        return
+                carry = bytes(buf[cut:total])
+                self._submit_block(state, slot_index, cut, block_start + cut)
+                block_start += cut
+                if last:
+                    return
+
+    def _scan_whole_file(self, state):
+        """Confie le fichier entier à _recherche_DB_internal, qui relit les lignes démesurées par fenêtres
+        (scan_windowed_file) : une coupure arbitraire perdrait les occurrences à cheval et couperait des caractères."""
+        with state.lock:
+            state.prefix_broken = True # Plus de point de reprise : le fichier est relu depuis le début
+        task = (state.path, self.batabase_term, self.case_sensitive, self.output_mode, self.max_hits_per_file,
+                self.accent_insensitive, self.fuzzy_distance)
+        state.whole_file = self.executor.submit(RechercheDBAppTk._recherche_DB_process_wrapper, task)
+        state.whole_file.add_done_callback(lambda fut: state.maybe_finish())
+
+    def _submit_block(self, state, slot_index, length, end_offset):
+        with state.lock:
+            seq = state.blocks_submitted
+            state.blocks_submitted += 1
+        try:
+            scan_future = self.executor.submit(_scan_shared_block, self.slots[slot_index].name, length,
+                                               self.batabase_term, self.case_sensitive, state.hits_limit, state.count_only,
+                                               self.accent_insensitive, self.fuzzy_distance)
+        except Exception:
+            # Pool arrêté (limite globale atteinte) : rendre le tampon pour ne pas bloquer les autres threads
+            with state.lock:
+                state.blocks_submitted -= 1
+            self.free_slots.put(slot_index)
+            raise
+
+        def on_done(fut):
+            self.free_slots.put(slot_index)
+            result = None # Bloc annulé ou en échec
+            if not fut.cancelled():
+                try:
+                    newlines, hits = fut.result()
+                    result = (newlines, hits, end_offset - length, end_offset)
+                except Exception as e:
+                    state.errors.append(f"Erreur scan {os.path.basename(state.path)}: {str(e)}")
+            state.block_done(seq, result)
+        scan_future.add_done_callback(on_done)
+
+# --- Export des hits en continu pendant la recherche ---
+EXPORT_BUFFER_SIZE = 1024 * 1024 # Écritures bufferisées : un appel système par Mo plutôt que par hit
+
+class HitExporter:
+    """Écrit chaque hit dès qu'il est trouvé, en JSONL ou CSV (gzip si le chemin se termine par .gz).
+    Rien n'est conservé en mémoire : le fichier est la seule trace structurée des résultats."""
+    FIELDS = ("file", "line", "content")
+
+    def __init__(self, path, buffer_size=EXPORT_BUFFER_SIZE, append=False):
+        self.path = path
+        lowered = path.lower()
+        self.compressed = lowered.endswith('.gz')
+        base = lowered[:-3] if self.compressed else lowered
+        self.format = "csv" if base.endswith('.csv') else "jsonl"
+        # En reprise, on complète l'export existant (un nouveau membre gzip est valide à la suite du précédent)
+        has_content = append and os.path.exists(path) and os.path.getsize(path) > 0
+        self._raw = open(path, 'ab' if append else 'wb', buffering=buffer_size)
+        self._gzip = gzip.GzipFile(fileobj=self._raw, mode='wb', compresslevel=6) if self.compressed else None
+        self._text = io.TextIOWrapper(self._gzip or self._raw, encoding='utf-8', newline='', write_through=False)
+        self._csv_writer = None
+        if self.format == "csv":
+            self._csv_writer = csv.writer(self._text)
+            if not has_content:
+                self._csv_writer.writerow(self.FIELDS)
+        self.hits_written = 0
+
+    def write_hit(self, fichier, ligne, contenu):
+        if self._csv_writer:
+            self._csv_writer.writerow((fichier, ligne, contenu))
+        else:
+            self._text.write(json.dumps({"file": fichier, "line": ligne, "content": contenu}, ensure_ascii=False))
+            self._text.write("\n")
+        self.hits_written += 1
+
+    def close(self):
+        self._text.flush()
+        self._text.detach()
+        if self._gzip:
+            self._gzip.close()
+        self._raw.close()
+
+# --- Lots de requêtes enregistrés : toutes les requêtes en un seul passage sur les fichiers nouveaux ou modifiés ---
+QUERY_BATCHES_DIR = "dlu_batches" # Un sous-dossier par lot : état des fichiers déjà traités et un dossier par exécution
+QUERY_BATCH_OPTIONS = ("case_sensitive", "accent_insensitive", "fuzzy_distance", "max_hits_per_file")
+
+def _file_slug(text, max_length=40):
+    """Fragment de nom de fichier lisible, suffixé d'une empreinte pour que deux textes proches ne se confondent pas."""
+    slug = re.sub(r'[^\w-]+', '_', text).strip('_')[:max_length] or "x"
+    return f"{slug}-{hashlib.sha1(text.encode('utf-8')).hexdigest()[:8]}"
+
+def query_batch_key(query):
+    """Identité d'une requête d'un lot (terme et options) : une requête modifiée repart de zéro."""
+    return hashlib.sha1(json.dumps([query["term"]] + [query.get(option) for option in QUERY_BATCH_OPTIONS]).encode('utf-8')).hexdigest()[:16]
+
+class QueryBatchState:
+    """Fichiers déjà traités par un lot : {chemin: [taille, mtime_ns, [clés des requêtes appliquées]]}.
+    Un fichier modifié est repris pour toutes les requêtes, un fichier inchangé seulement pour les requêtes ajoutées au lot."""
+    def __init__(self, batch_name, directory=QUERY_BATCHES_DIR):
+        self.directory = os.path.join(directory, _file_slug(batch_name))
+        self.path = os.path.join(self.directory, "state.json")
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.files = json.load(f).get("files", {})
+        except (OSError, ValueError):
+            self.files = {}
+
+    def pending(self, paths, keys):
+        """[(chemin, indices des requêtes à appliquer, (taille, mtime_ns))] ; les fichiers disparus sont oubliés."""
+        travail = []
+        present = set()
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            present.add(path)
+            entry = self.files.get(path)
+            done = set(entry[2]) if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns else set()
+            indices = [i for i, key in enumerate(keys) if key not in done]
+            if indices:
+                travail.append((path, indices, (st.st_size, st.st_mtime_ns)))
+        self.files = {path: entry for path, entry in self.files.items() if path in present}
+        return travail
+
+    def mark_done(self, path, stat_key, keys):
+        entry = self.files.get(path)
+        if entry and (entry[0], entry[1]) == tuple(stat_key):
+            entry[2] = sorted(set(entry[2]) | set(keys))
+        else:
+            self.files[path] = [stat_key[0], stat_key[1], sorted(keys)]
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"files": self.files}, f)
+        os.replace(tmp_path, self.path)
+
+_NORMALIZERS = {"fold": fold_text, "lower": str.lower, "same": lambda texte: texte}
+
+def scan_query_batch(path, queries):
+    """Applique toutes les requêtes d'un lot en une seule lecture du fichier (exécuté dans un worker).
+    queries : [(terme, sensible à la casse, sans accents, distance approchée, max hits par fichier)].
+    Chaque bloc de lignes est normalisé une fois par sorte de normalisation (casse, accents), puis partagé.
+    Retourne ([HitBatch par requête], erreurs, [secondes de recherche par requête])."""
+    timings = [0.0] * len(queries)
+    if path.lower().endswith(('.csv',) + SOURCE_READER_EXTENSIONS):
+        return _scan_query_batch_separately(path, queries, timings) # Lecteurs par enregistrement : une lecture par requête
+    prepared = []
+    for term, case_sensitive, accent_insensitive, fuzzy_distance, max_hits in queries:
+        kind = "fold" if accent_insensitive else "same" if case_sensitive else "lower"
+        # Sans accents, le matcher à distance 0 fait la recherche exacte sur le texte replié (lignes de longueur variable)
+        matcher = _get_fuzzy_matcher(term, fuzzy_distance, case_sensitive, accent_insensitive) if fuzzy_distance or accent_insensitive else None
+        prepared.append((kind, matcher, matcher.pattern if matcher else _NORMALIZERS[kind](term), max_hits))
+    for encoding in ('utf-8', 'latin-1', 'cp1252'):
+        hits = [[] for _ in queries]
+        try:
+            with open(path, 'r', encoding=encoding) as fichier:
+                line_base, carry = 0, ''
+                while not all(max_hits and len(hits[i]) >= max_hits for i, (_, _, _, max_hits) in enumerate(prepared)):
+                    chunk = fichier.read(FOLD_SCAN_BLOCK_SIZE)
+                    texte = carry + chunk
+                    if not texte:
+                        break
+                    last = len(chunk) < FOLD_SCAN_BLOCK_SIZE # Lecture incomplète : fin de fichier
+                    cut = len(texte) if last else texte.rfind('\n') + 1
+                    if not cut:
+                        raise LongLineError(f"ligne de plus de {FOLD_SCAN_BLOCK_SIZE} caractères")
+                    texte, carry = texte[:cut], texte[cut:]
+                    haystacks = {}
+                    for i, (kind, matcher, needle, max_hits) in enumerate(prepared):
+                        if max_hits and len(hits[i]) >= max_hits:
+                            continue
+                        started = time.perf_counter()
+                        haystack = haystacks.get(kind)
+                        if haystack is None:
+                            haystack = haystacks[kind] = _NORMALIZERS[kind](texte)
+                        positions = matcher.iter_line_matches(haystack) if matcher else iter_exact_line_matches(haystack, needle)
+                        for index, ligne_texte in iter_lines_at(texte, haystack, positions):
+                            hits[i].append((path, line_base + index + 1, clip_hit_line(ligne_texte.strip(), needle, _NORMALIZERS[kind]), None))
+                            if max_hits and len(hits[i]) >= max_hits:
+                                break
+                        timings[i] += time.perf_counter() - started
+                    line_base += texte.count('\n')
+                    if last:
+                        break
+            return [HitBatch.pack(h) for h in hits], [], timings
+        except UnicodeDecodeError:
+            continue
+        except LongLineError:
+            return _scan_query_batch_separately(path, queries, [0.0] * len(queries)) # Lecture par fenêtres, requête par requête
+        except Exception as e:
+            return [HitBatch() for _ in queries], [f"Erreur lecture {os.path.basename(path)} ({encoding}): {str(e)}"], timings
+    return [HitBatch() for _ in queries], [f"Erreur de décodage pour {os.path.basename(path)} après toutes les tentatives."], timings
+
+def _scan_query_batch_separately(path, queries, timings):
+    resultats, erreurs = [], []
+    for i, (term, case_sensitive, accent_insensitive, fuzzy_distance, max_hits) in enumerate(queries):
+        started = time.perf_counter()
+        found, errors = RechercheDBAppTk._recherche_DB_internal(path, term, case_sensitive, "lines", max_hits, accent_insensitive, fuzzy_distance)
+        timings[i] += time.perf_counter() - started
+        resultats.append(HitBatch.pack(found))
+        erreurs.extend(errors)
+    return resultats, erreurs, timings
+
+# --- Sélection des fichiers par le contenu (mode automatique) ---
+SNIFF_BYTES = 8192 # Octets inspectés en tête de fichier
+SNIFF_MAX_NUL_RATIO = 0.001 # Au-delà, le fichier est considéré comme binaire
+SNIFF_MAX_CONTROL_RATIO = 0.05 # Pour les fichiers non UTF-8 (latin-1/cp1252)
+SNIFF_CACHE_PATH = os.path.join(INDEX_DIR, "sniff_cache.json")
+_BINARY_MAGICS = (b'PK\x03\x04', b'%PDF', b'\x89PNG', b'\x1f\x8b', b'\x7fELF', b'MZ', b'SQLite format 3\x00',
+                  b'\xff\xd8\xff', b'GIF8', b'7z\xbc\xaf', b'Rar!', b'BZh', b'\xfd7zXZ')
+_TEXT_CONTROL_BYTES = frozenset(b'\t\n\r\x0c\x08\x1b')
+
+def sniff_is_text(sample):
+    """Décide sur les premiers Ko si un fichier est du texte : signatures binaires, densité de NUL, validité UTF-8."""
+    if not sample:
+        return True
+    if sample.startswith(_BINARY_MAGICS):
+        return False
+    if sample.count(0) > len(sample) * SNIFF_MAX_NUL_RATIO:
+        return False
     try:
-        import ctypes
-        from ctypes import wintypes
-        _ctypes_available = True
-    except ImportError:
-        print("ctypes non disponible, les coins arrondis de la fenêtre ne seront pas appliqués.")
-        _ctypes_available = False
+        # Décodage incrémental : un caractère multi-octets coupé en fin d'échantillon reste valide
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return True
+    except UnicodeDecodeError:
+        pass
+    controls = sum(1 for b in sample if (b < 32 and b not in _TEXT_CONTROL_BYTES) or b == 127)
+    return controls <= len(sample) * SNIFF_MAX_CONTROL_RATIO
+
+class FileTypeCache:
+    """Cache persistant texte/binaire par fichier, invalidé par la taille et la date de modification.
+    Un fichier déjà vu est tranché avec un simple stat()."""
+    def __init__(self, path=SNIFF_CACHE_PATH):
+        self.path = path
+        self.entries = {}
+        self.modified = False
+        self.lock = threading.Lock() # Le service local partage le cache entre requêtes
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def is_text(self, file_path):
+        st = os.stat(file_path)
+        cached = self.entries.get(file_path)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        with open(file_path, 'rb') as f:
+            result = sniff_is_text(f.read(SNIFF_BYTES))
+        with self.lock: # save() peut copier le dictionnaire au même moment depuis une autre requête
+            self.entries[file_path] = [st.st_size, st.st_mtime_ns, result]
+            self.modified = True
+        return result
+
+    def save(self):
+        if not self.modified:
+            return
+        with self.lock:
+            self.modified = False
+            entries = dict(self.entries)
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+
+# --- Fichiers identiques (même dump copié sous plusieurs noms) : un seul est parcouru ---
+CONTENT_MANIFEST_PATH = os.path.join(INDEX_DIR, "content_manifest.json")
+CONTENT_SAMPLE_SIZE = 64 * 1024 # Octets lus au début, au milieu et à la fin pour l'empreinte rapide
+CONTENT_HASH_BLOCK_SIZE = 1024 * 1024
+
+class ContentManifest:
+    """Empreintes de contenu persistantes, invalidées par la taille et la date de modification.
+    Tri en trois passes : taille (stat seul), empreinte échantillonnée, puis empreinte complète ;
+    seuls les fichiers encore candidats à chaque passe sont lus."""
+    def __init__(self, path=CONTENT_MANIFEST_PATH):
+        self.path = path
+        self.modified = False
+        self.lock = threading.Lock() # Le service local partage le manifeste entre requêtes
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def _entry(self, file_path, st):
+        with self.lock:
+            cached = self.entries.get(file_path)
+            if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+                return cached
+            entry = self.entries[file_path] = [st.st_size, st.st_mtime_ns, None, None]
+            self.modified = True
+            return entry
+
+    def sample_hash(self, file_path, st):
+        entry = self._entry(file_path, st)
+        if entry[2] is None:
+            digest = hashlib.sha1()
+            with open(file_path, 'rb') as f:
+                if st.st_size <= 3 * CONTENT_SAMPLE_SIZE:
+                    digest.update(f.read())
+                else:
+                    for position in (0, st.st_size // 2, st.st_size - CONTENT_SAMPLE_SIZE):
+                        f.seek(position)
+                        digest.update(f.read(CONTENT_SAMPLE_SIZE))
+            with self.lock: # Empreinte calculée hors verrou, enregistrée sous verrou
+                entry[2] = digest.hexdigest()
+                self.modified = True
+        return entry[2]
+
+    def full_hash(self, file_path, st):
+        entry = self._entry(file_path, st)
+        if st.st_size <= 3 * CONTENT_SAMPLE_SIZE:
+            return self.sample_hash(file_path, st) # L'échantillon couvre déjà tout le fichier
+        if entry[3] is None:
+            digest = hashlib.sha1()
+            with open(file_path, 'rb') as f:
+                for block in iter(lambda: f.read(CONTENT_HASH_BLOCK_SIZE), b''):
+                    digest.update(block)
+            with self.lock:
+                entry[3] = digest.hexdigest()
+                self.modified = True
+        return entry[3]
+
+    def group_identical(self, file_paths):
+        """Retourne (fichiers à parcourir, {fichier parcouru: [copies identiques]}), dans l'ordre d'origine.
+        Un fichier illisible reste à parcourir : la recherche signalera l'erreur."""
+        stats = {}
+        by_size = {}
+        for file_path in file_paths:
+            try:
+                stats[file_path] = os.stat(file_path)
+            except OSError:
+                continue
+            by_size.setdefault(stats[file_path].st_size, []).append(file_path)
+
+        representative = {}
+        same_sample = self._split_groups(by_size.values(), self.sample_hash, stats)
+        for group in self._split_groups(same_sample, self.full_hash, stats):
+            for copy_path in group[1:]:
+                representative[copy_path] = group[0]
+
+        copies = {}
+        to_scan = []
+        for file_path in file_paths:
+            if file_path in representative:
+                copies.setdefault(representative[file_path], []).append(file_path)
+            else:
+                to_scan.append(file_path)
+        return to_scan, copies
+
+    @staticmethod
+    def _split_groups(groups, hash_function, stats):
+        """Sous-groupes d'au moins deux fichiers ayant la même empreinte."""
+        result = []
+        for group in groups:
+            if len(group) < 2:
+                continue
+            by_hash = {}
+            for file_path in group:
+                try:
+                    by_hash.setdefault(hash_function(file_path, stats[file_path]), []).append(file_path)
+                except OSError:
+                    continue
+            result.extend(same for same in by_hash.values() if len(same) > 1)
+        return result
+
+    def save(self):
+        if not self.modified:
+            return
+        with self.lock: # Une seule écriture à la fois du fichier temporaire
+            self.modified = False
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self.path)
+
+# --- Ordonnancement par périphérique et ajustement automatique du nombre de workers ---
+# Lectures simultanées max par type de support (None = seulement la limite globale de workers)
+DEVICE_IO_LIMITS = {"hdd": 2, "network": 4, "ssd": None, "unknown": None}
+_NETWORK_FS_TYPES = ("nfs", "nfs4", "cifs", "smb3", "smbfs", "fuse.sshfs", "9p", "afs", "ceph", "glusterfs", "davfs")
+AUTOTUNE_INTERVAL = 2.0 # Secondes entre deux ajustements du nombre de tâches en vol
+AUTOTUNE_TOLERANCE = 0.05 # Une baisse de débit de plus de 5 % inverse le sens de l'ajustement
+
+def _linux_mount_fstype(path):
+    """Type de système de fichiers du point de montage le plus long contenant path (via /proc/mounts)."""
+    real = os.path.realpath(path)
+    best, best_type = "", None
+    try:
+        with open("/proc/mounts", "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) < 3:
+                    continue
+                mount_point = parts[1].replace("\\040", " ")
+                if (real == mount_point or real.startswith(mount_point.rstrip("/") + "/")) and len(mount_point) > len(best):
+                    best, best_type = mount_point, parts[2]
+    except OSError:
+        return None
+    return best_type
+
+def detect_device_kind(path, st_dev):
+    """Classe le support d'un fichier : "ssd", "hdd", "network" ou "unknown"."""
+    system = platform.system()
+    if system == "Windows":
+        if os.path.abspath(path).startswith("\\\\"):
+            return "network"
+        try:
+            import ctypes
+            drive = os.path.splitdrive(os.path.abspath(path))[0] + "\\"
+            if ctypes.windll.kernel32.GetDriveTypeW(drive) == 4: # DRIVE_REMOTE
+                return "network"
+        except Exception:
+            pass
+        return "unknown"
+    if system != "Linux":
+        return "unknown"
+    fstype = _linux_mount_fstype(path)
+    if fstype and fstype.startswith(_NETWORK_FS_TYPES):
+        return "network"
+    sys_dev = f"/sys/dev/block/{os.major(st_dev)}:{os.minor(st_dev)}"
+    try:
+        sys_dev = os.path.realpath(sys_dev)
+        if os.path.exists(os.path.join(sys_dev, "partition")):
+            sys_dev = os.path.dirname(sys_dev) # Une partition hérite du disque parent
+        with open(os.path.join(sys_dev, "queue", "rotational"), "r") as f:
+            return "hdd" if f.read().strip() == "1" else "ssd"
+    except OSError:
+        return "unknown"
+
+class DeviceScheduler:
+    """Répartit les fichiers par périphérique (st_dev) et borne les lectures simultanées sur chacun.
+    Les périphériques sont servis à tour de rôle pour que les disques travaillent en parallèle."""
+    def __init__(self, files, device_limits=DEVICE_IO_LIMITS):
+        self.queues = {}
+        self.kinds = {}
+        self.limits = {}
+        self.in_flight = {}
+        self.file_device = {}
+        self.file_size = {}
+        for path in files:
+            try:
+                st = os.stat(path)
+                dev, size = st.st_dev, st.st_size
+            except OSError:
+                dev, size = None, 0
+            if dev not in self.queues:
+                self.queues[dev] = deque()
+                self.kinds[dev] = detect_device_kind(path, dev) if dev is not None else "unknown"
+                self.limits[dev] = device_limits.get(self.kinds[dev])
+                self.in_flight[dev] = 0
+            self.queues[dev].append(path)
+            self.file_device[path] = dev
+            self.file_size[path] = size
+        self.rotation = deque(self.queues)
+
+    def take(self, n):
+        """Retourne jusqu'à n fichiers à lancer, en respectant la limite de chaque périphérique."""
+        taken = []
+        idle_turns = 0
+        while len(taken) < n and self.rotation and idle_turns < len(self.rotation):
+            dev = self.rotation[0]
+            self.rotation.rotate(-1)
+            limit = self.limits[dev]
+            if self.queues[dev] and (limit is None or self.in_flight[dev] < limit):
+                taken.append(self.queues[dev].popleft())
+                self.in_flight[dev] += 1
+                idle_turns = 0
+            else:
+                idle_turns += 1
+        return taken
+
+    def release(self, path):
+        """Signale la fin d'un fichier ; retourne sa taille (pour la mesure de débit)."""
+        self.in_flight[self.file_device[path]] -= 1
+        return self.file_size.get(path, 0)
+
+    def describe(self):
+        parts = []
+        for dev, kind in self.kinds.items():
+            limit = self.limits[dev]
+            count = sum(1 for d in self.file_device.values() if d == dev)
+            parts.append(f"{kind} ({count} fichiers, {'max ' + str(limit) if limit else 'sans limite'})")
+        return ", ".join(parts)
+
+class WorkerAutoTuner:
+    """Ajuste le nombre de fichiers en vol par montée de colline sur le débit mesuré (octets/s)."""
+    def __init__(self, initial, minimum, maximum, interval=AUTOTUNE_INTERVAL):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.window = max(minimum, min(initial, maximum))
+        self.interval = interval
+        self.direction = 1
+        self.last_rate = None
+        self.bytes_done = 0
+        self.started = time.monotonic()
+
+    def record(self, nbytes):
+        """Ajoute les octets d'un fichier terminé ; retourne True si la fenêtre a changé."""
+        self.bytes_done += nbytes
+        now = time.monotonic()
+        elapsed = now - self.started
+        if elapsed < self.interval:
+            return False
+        rate = self.bytes_done / elapsed
+        if self.last_rate is not None and rate < self.last_rate * (1 - AUTOTUNE_TOLERANCE):
+            self.direction = -self.direction # Le dernier pas a dégradé le débit : repartir dans l'autre sens
+        self.last_rate = rate
+        self.bytes_done = 0
+        self.started = now
+        new_window = max(self.minimum, min(self.window + self.direction, self.maximum))
+        if new_window == self.window:
+            self.direction = -self.direction # Butée atteinte : explorer l'autre sens au prochain tour
+        changed = new_window != self.window
+        self.window = new_window
+        return changed
+
+# --- Points de reprise des recherches longues ---
+CHECKPOINT_DIR = "dlu_checkpoints"
+
+class SearchCheckpoint:
+    """Journal de reprise JSONL (une ligne par événement, vidée à chaque écriture), identifié par les paramètres
+    de la requête. Relancer la même recherche saute les fichiers terminés, reprend les fichiers entamés à leur
+    dernier offset et réaffiche les hits déjà trouvés une seule fois. Le journal est supprimé en fin de recherche."""
+    def __init__(self, query, directory=CHECKPOINT_DIR):
+        os.makedirs(directory, exist_ok=True)
+        key = hashlib.sha1(json.dumps(query, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()[:24]
+        self.path = os.path.join(directory, key + ".jsonl")
+        self.done_files = {}
+        self.partial_files = {}
+        self._load()
+        self.resumed = bool(self.done_files or self.partial_files)
+        self._stats = {}
+        self.lock = threading.Lock()
+        self._journal = open(self.path, "a" if self.resumed else "w", encoding="utf-8")
+        if not self.resumed:
+            self._write({"type": "query", "query": query})
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue # Dernière ligne tronquée par un arrêt brutal
+                    path = record.get("file")
+                    if record.get("type") == "file":
+                        self.done_files[path] = record
+                        self.partial_files.pop(path, None)
+                    elif record.get("type") == "chunk":
+                        partial = self.partial_files.get(path)
+                        if not partial or (partial["size"], partial["mtime_ns"]) != (record["size"], record["mtime_ns"]):
+                            partial = self.partial_files[path] = {"size": record["size"], "mtime_ns": record["mtime_ns"],
+                                                                  "offset": 0, "lines": 0, "hits": [], "count": 0}
+                        partial["offset"] = record["offset"]
+                        partial["lines"] = record["lines"]
+                        partial["hits"].extend(record["hits"])
+                        partial["count"] += record["count"]
+        except OSError:
+            pass
+
+    def _file_stat(self, path):
+        st = self._stats.get(path)
+        if st is None:
+            try:
+                st = os.stat(path)
+                st = self._stats[path] = (st.st_size, st.st_mtime_ns)
+            except OSError:
+                st = (None, None)
+        return st
+
+    def _unchanged(self, path, record):
+        return self._file_stat(path) == (record["size"], record["mtime_ns"])
+
+    def done_record(self, path):
+        """Enregistrement d'un fichier déjà terminé et inchangé depuis, sinon None."""
+        record = self.done_files.get(path)
+        return record if record and self._unchanged(path, record) else None
+
+    def resume_point(self, path):
+        """Point de reprise d'un fichier entamé (offset, lignes, hits), sinon None."""
+        partial = self.partial_files.get(path)
+        return partial if partial and self._unchanged(path, partial) else None
+
+    def _write(self, record):
+        with self.lock:
+            self._journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._journal.flush()
+
+    def record_chunk(self, path, offset, lines, new_hits, new_count):
+        size, mtime_ns = self._file_stat(path)
+        self._write({"type": "chunk", "file": path, "size": size, "mtime_ns": mtime_ns, "offset": offset, "lines": lines,
+                     "hits": [[ligne, contenu, offset] for _, ligne, contenu, offset in new_hits], "count": new_count})
+
+    def record_file(self, path, hits, count, duplicates, errors):
+        size, mtime_ns = self._file_stat(path)
+        self._write({"type": "file", "file": path, "size": size, "mtime_ns": mtime_ns,
+                     "hits": [[ligne, contenu, offset] for _, ligne, contenu, offset in hits], "count": count,
+                     "duplicates": duplicates, "errors": errors})
+
+    def close(self, completed=False):
+        with self.lock:
+            self._journal.close()
+        if completed:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
 
 class RechercheDBAppTk:
     CONFIG_FILE_PATH = "config.json"
+    UI_FRAME_BUDGET_MS = 33 # Au plus un rafraîchissement de l'UI toutes les 33 ms (~30 images/s) pendant une recherche
 
     def __init__(self, master):
         self.master = master
@@ -61,8 +1939,12 @@ class RechercheDBAppTk:
             # Sur d'autres OS, ou si ctypes n'est pas dispo, le root_container avec son propre BG
             # remplira la fenêtre. Pas besoin de configurer master.bg car root_container le couvrira.
 
-        self.dossier_parent = ''
+        self.dossiers_parents = [] # Dossiers racines parcourus ensemble (sauvegardés dans config.json)
         self.ui_queue = queue.Queue() 
+        # Réveil de Tk par événement virtuel : un seul réveil en attente à la fois, aucune scrutation au repos
+        self._ui_wakeup_lock = threading.Lock()
+        self._ui_wakeup_pending = False
+        self._ui_last_flush = 0.0
 
 
         self.search_hits_count = 0
@@ -107,9 +1989,6 @@ class RechercheDBAppTk:
         self.current_theme_name = "Spécial H3xorrr" # Thème par défaut
         self._load_theme_settings(self.current_theme_name) # Charge tous les paramètres du thème
 
-        # Charger les paramètres depuis le fichier AVANT d'initialiser les Var de Tkinter
-        self._load_app_settings() 
-
         # Paramètres de recherche d'extensions
         self.DEFAULT_EXTENSIONS_LIST = ['.txt', '.sql', '.csv']
         self.current_extensions_list = list(self.DEFAULT_EXTENSIONS_LIST)
@@ -119,7 +1998,43 @@ class RechercheDBAppTk:
         self.DEFAULT_MAX_WORKERS = min(max(1, (os.cpu_count() or 1) // 2), 32) # Défaut plus conservateur
         self.current_max_workers = self.DEFAULT_MAX_WORKERS
         self.max_workers_var = tk.IntVar(value=self.current_max_workers)
+        self.auto_tune_workers_var = tk.BooleanVar(value=True) # Ajuste le nombre de fichiers en vol selon le débit
         self.case_sensitive_var = tk.BooleanVar(value=False) # Par défaut, insensible à la casse
+        self.accent_insensitive_var = tk.BooleanVar(value=False) # é = e, casse ignorée
+        self.fuzzy_var = tk.BooleanVar(value=False) # Recherche approchée (fautes de frappe)
+        self.fuzzy_distance_var = tk.IntVar(value=DEFAULT_FUZZY_DISTANCE)
+        # Service de recherche local (python DLU_V3.py --serve) : pool et caches déjà chauds, partagés entre instances
+        self.search_service_var = tk.BooleanVar(value=False)
+        self.search_service_port_var = tk.IntVar(value=DEFAULT_DAEMON_PORT)
+        # Recherche distribuée : une partition des dossiers par nœud (services --serve sur d'autres machines ou ports)
+        self.distributed_search_var = tk.BooleanVar(value=False)
+        self.search_nodes_var = tk.StringVar(value="")
+        # Mode "auto" : les fichiers sont retenus selon leur contenu (texte/binaire), quelle que soit l'extension
+        self.content_sniffing_var = tk.BooleanVar(value=False)
+        # Recherche exacte par champ (index trié par colonne, fichiers .csv/.sql uniquement)
+        self.exact_field_var = tk.BooleanVar(value=False)
+        self.exact_field_column_var = tk.StringVar(value="1")
+        # Lecture anticipée (threads d'E/S + mémoire partagée), profondeur de prefetch configurable
+        self.read_ahead_var = tk.BooleanVar(value=False)
+        self.prefetch_depth_var = tk.IntVar(value=DEFAULT_PREFETCH_DEPTH)
+        # Export des hits en continu (JSONL/CSV, .gz pour compresser)
+        self.stream_export_var = tk.BooleanVar(value=False)
+        self.stream_export_path_var = tk.StringVar(value="")
+        # Modes de sortie façon grep (lignes / fichiers contenant / comptage) et limites de hits (0 = illimité)
+        self.OUTPUT_MODES = {"Lignes trouvées": "lines", "Fichiers contenant le terme": "files", "Nombre de hits par fichier": "count"}
+        self.output_mode_var = tk.StringVar(value="Lignes trouvées")
+        self.max_hits_total_var = tk.IntVar(value=0)
+        self.max_hits_per_file_var = tk.IntVar(value=0)
+        # Journal de reprise des recherches longues (dlu_checkpoints/)
+        self.checkpoint_var = tk.BooleanVar(value=False)
+        self.skip_identical_files_var = tk.BooleanVar(value=False) # Même contenu sous plusieurs noms : parcouru une fois
+        # Lots de requêtes enregistrés : nom -> [{"term", options}], relancés sur les seuls fichiers nouveaux ou modifiés
+        self.query_batches = {}
+        self.query_batch_name_var = tk.StringVar(value="")
+        # Contexte des hits (double-clic) : ligne du widget -> (fichier, ligne, offset)
+        self.context_lines_var = tk.IntVar(value=DEFAULT_CONTEXT_LINES)
+        self.hit_locations = {}
+        self.context_window = None
         # Paramètres d'exclusion
         self.DEFAULT_EXCLUDED_PATHS_LIST = [".git", ".svn", "node_modules", "__pycache__", "venv", ".venv", "target", "build", "dist"]
         self.current_excluded_paths_list = list(self.DEFAULT_EXCLUDED_PATHS_LIST)
@@ -133,12 +2048,19 @@ class RechercheDBAppTk:
         self.new_item_color_var = tk.StringVar(value=self.COLOR_RESULT_NEW)
         self.error_item_color_var = tk.StringVar(value=self.COLOR_RESULT_ERROR)
 
+        # Charger les paramètres depuis le fichier une fois toutes les Var de Tkinter créées, AVANT de construire l'UI
+        self._load_app_settings()
+        try:
+            ensure_search_service_token() # Ici, dans le thread principal : les threads de recherche ne font que le lire
+        except OSError as e:
+            print(f"Erreur lors de l'enregistrement du jeton du service: {e}")
+
         self._init_ui()
         self._apply_styles() # Doit être appelé APRÈS _init_ui où title_bar est créé
         # Variables pour le déplacement de la fenêtre
         self._offset_x = 0
         self._offset_y = 0
-        self.master.after(100, self._process_ui_queue) # Vérifier la file d'attente de l'UI régulièrement
+        self.master.bind("<<UIQueue>>", self._on_ui_wakeup)
 
         # Appliquer les coins arrondis pour la fenêtre principale (Windows uniquement)
         if _ctypes_available:
@@ -148,14 +2070,15 @@ class RechercheDBAppTk:
         # Centrer la fenêtre avant de la rendre visible
         self._center_window()
 
-        # Configurer le Glisser-Déposer si tkinterdnd2 est disponible
-        if TkinterDnD:
-            self.root_container.drop_target_register(DND_FILES)
-            self.root_container.dnd_bind('<<Drop>>', self._handle_dnd_folder_drop)
+        # Configurer le Glisser-Déposer une fois la fenêtre affichée (import + chargement de tkdnd coûteux)
+        self.master.after(500, self._setup_drag_and_drop)
 
         # Gérer la sauvegarde des paramètres à la fermeture
         self.master.protocol("WM_DELETE_WINDOW", self._on_closing)
 
+        if self.dossiers_parents:
+            self._put_on_ui_queue("status_label", f"Dossiers: {self._describe_root_folders()}")
+
         # Démarrer l'animation de fondu enchaîné
         self._animate_fade_in()
 
@@ -222,11 +2145,11 @@ class RechercheDBAppTk:
         self.content_host_frame.pack(fill=tk.BOTH, expand=True, padx=1, pady=1)
 
         self._build_main_view()
-        self._build_settings_view()
+        # La vue des paramètres (Notebook, énumération des polices...) est construite à la première ouverture
+        self.settings_view_frame = None
 
         self.current_view_frame = self.main_view_frame # La vue actuelle
         self.main_view_frame.pack(fill=tk.BOTH, expand=True) # Afficher la vue principale au démarrage
-        self.settings_view_frame.pack_forget() # S'assurer que la vue des paramètres est cachée
 
     def _build_main_view(self):
         """Construit l'interface utilisateur principale de l'application."""
@@ -248,9 +2171,12 @@ class RechercheDBAppTk:
         # Appliquer le style placeholder initialement, sans animation pour le premier affichage
         self.batabase_input.configure(style='Placeholder.TEntry')
 
-        self.dossier_button = ttk.Button(input_frame, text="Choisir Dossier", command=self.choisir_dossier)
+        self.dossier_button = ttk.Button(input_frame, text="Ajouter Dossier", command=self.choisir_dossier)
         self.dossier_button.pack(side=tk.LEFT, padx=(0, 5))
 
+        self.clear_dossiers_button = ttk.Button(input_frame, text="Vider", width=6, command=self._clear_root_folders)
+        self.clear_dossiers_button.pack(side=tk.LEFT, padx=(0, 5))
+
         self.rechercher_button = ttk.Button(input_frame, text="Rechercher", style="Accent.TButton", command=self.lancer_recherche)
         self.rechercher_button.pack(side=tk.LEFT)
 
@@ -275,6 +2201,7 @@ class RechercheDBAppTk:
         self.results_context_menu.add_separator() # Index 3
         self.results_context_menu.add_command(label="Sauvegarder les résultats...", command=self._save_results) # Index 4
         self.resultats_text.bind("<Button-3>", self._show_results_context_menu) # Clic droit
+        self.resultats_text.bind("<Double-Button-1>", self._show_hit_context)
 
         self._reconfigure_result_tags() # Appliquer les styles de tag initiaux
 
@@ -389,21 +2316,113 @@ class RechercheDBAppTk:
         # --- Contenu de l'onglet Recherche (maintenant dans scrollable_frame_recherche) ---
         ttk.Label(scrollable_frame_recherche, text="Extensions de fichiers autorisées (séparées par des virgules, ex: .txt,.log,.data):").pack(anchor='w', pady=(5,2))
         self.extensions_entry = ttk.Entry(scrollable_frame_recherche, textvariable=self.extensions_str_var, width=50)
-        self.extensions_entry.pack(fill='x', pady=(0,10))
+        self.extensions_entry.pack(fill='x', pady=(0,2))
+        ttk.Label(scrollable_frame_recherche, text="Lecteurs dédiés : .db/.sqlite/.sqlite3 (lignes des tables, via sqlite3) et .ndjson/.jsonl (valeurs texte uniquement).", font=(self.DEFAULT_FONT_FAMILY, max(6, self.DEFAULT_FONT_SIZE - 2) )).pack(anchor='w', pady=(0,4))
+        self.content_sniffing_checkbutton = ttk.Checkbutton(scrollable_frame_recherche, text="Auto : sélectionner les fichiers texte d'après leur contenu", variable=self.content_sniffing_var)
+        self.content_sniffing_checkbutton.pack(anchor='w', pady=(2,0))
+        ttk.Label(scrollable_frame_recherche, text="Les extensions sont ignorées : .dump, .log ou sans extension sont lus s'ils contiennent du texte, les binaires sont écartés\n(sauf les bases SQLite).", font=(self.DEFAULT_FONT_FAMILY, max(6, self.DEFAULT_FONT_SIZE - 2) )).pack(anchor='w', padx=(20,0), pady=(0,10))
         
         self.filter_duplicates_checkbutton = ttk.Checkbutton(scrollable_frame_recherche, text="Filtrer les résultats en double", variable=self.filter_duplicates_var)
         self.filter_duplicates_checkbutton.pack(anchor='w', pady=(5,10))
+        self.skip_identical_files_checkbutton = ttk.Checkbutton(scrollable_frame_recherche, text="Parcourir une seule fois les fichiers identiques", variable=self.skip_identical_files_var)
+        self.skip_identical_files_checkbutton.pack(anchor='w', pady=(0,0))
+        ttk.Label(scrollable_frame_recherche, text="Copies détectées par taille puis empreinte (conservée dans dlu_index) ; chaque hit cite toutes les copies.", font=(self.DEFAULT_FONT_FAMILY, max(6, self.DEFAULT_FONT_SIZE - 2) )).pack(anchor='w', padx=(20,0), pady=(0,10))
 
         self.case_sensitive_checkbutton = ttk.Checkbutton(scrollable_frame_recherche, text="Recherche sensible à la casse", variable=self.case_sensitive_var)
         self.case_sensitive_checkbutton.pack(anchor='w', pady=(5,0)) # Réduction du pady en bas
         ttk.Label(scrollable_frame_recherche, text="Coché : 'Mot' ne trouvera pas 'mot'. Décoché : 'Mot' trouvera 'mot'.", font=(self.DEFAULT_FONT_FAMILY, max(6, self.DEFAULT_FONT_SIZE - 2) )).pack(anchor='w', padx=(20,0), pady=(0,10)) # Ajout du texte explicatif
+        self.accent_insensitive_checkbutton = ttk.Checkbutton(scrollable_frame_recherche, text="Ignorer les accents et la casse", variable=self.accent_insensitive_var)
+        self.accent_insensitive_checkbutton.pack(anchor='w', pady=(5,0))
+        ttk.Label(scrollable_frame_recherche, text="'ecole' trouvera 'École' et 'ÉCOLE' (UTF-8, Latin-1, cp1252). Prioritaire sur la sensibilité à la casse ;\nsans effet sur la recherche exacte par champ.", font=(self.DEFAULT_FONT_FAMILY, max(6, self.DEFAULT_FONT_SIZE - 2) )).pack(anchor='w', padx=(20,0), pady=(0,10))
+        self.fuzzy_checkbutton = ttk.Checkbutton(scrollable_frame_recherche, text="Recherche approchée (tolère les fautes de frappe)", variable=self.fuzzy_var)
+        self.fuzzy_checkbutton.pack(anchor='w', pady=(5,0))
+        fuzzy_frame = ttk.Frame(scrollable_frame_recherche)
+        fuzzy_frame.pack(anchor='w', padx=(20,0), pady=(2,0))
+        ttk.Label(fuzzy_frame, text="Erreurs tolérées:").pack(side=tk.LEFT, padx=(0,5))
+        ttk.Spinbox(fuzzy_frame, from_=1, to=MAX_FUZZY_DISTANCE, increment=1, textvariable=self.fuzzy_distance_var, width=5).pack(side=tk.LEFT)
+        ttk.Label(scrollable_frame_recherche, text="Avec 1 erreur, 'Dupont' trouve 'Dupond' ou 'Dupnt'. Plus le terme est long, plus le filtrage reste rapide.", font=(self.DEFAULT_FONT_FAMILY, max(6, self.DEFAULT_FONT_SIZE - 2) )).pack(anchor='w', padx=(20,0), pady=(0,10))
+
+        self.exact_field_checkbutton = ttk.Checkbutton(scrollable_frame_recherche, text="Recherche exacte par champ (index, .csv/.sql)", variable=self.exact_field_var)
+        self.exact_field_checkbutton.pack(anchor='w', pady=(5,0))
+        exact_field_frame = ttk.Frame(scrollable_frame_recherche)
+        exact_field_frame.pack(anchor='w', padx=(20,0), pady=(2,0))
+        ttk.Label(exact_field_frame, text="Colonne (nom ou numéro):").pack(side=tk.LEFT, padx=(0,5))
+        self.exact_field_column_entry = ttk.Entry(exact_field_frame, textvariable=self.exact_field_column_var, width=15)
+        self.exact_field_column_entry.pack(side=tk.LEFT)
+        ttk.Label(scrollable_frame_recherche, text="La valeur doit correspondre exactement au champ. L'index est construit au premier passage puis réutilisé.", font=(self.DEFAULT_FONT_FAMILY, max(6, self.DEFAULT_FONT_SIZE - 2) )).pack(anchor='w', padx=(20,0), pady=(0,10))
+
+        ttk.Label(scrollable_frame_recherche, text="Mode de sortie:").pack(anchor='w', pady=(10,0))
+        self.output_mode_combo = ttk.Combobox(scrollable_frame_recherche, textvariable=self.output_mode_var, values=list(self.OUTPUT_MODES), state="readonly", width=30)
+        self.output_mode_combo.pack(anchor='w', pady=(0,2))
+        hits_limits_frame = ttk.Frame(scrollable_frame_recherche)
+        hits_limits_frame.pack(anchor='w', pady=(2,0))
+        ttk.Label(hits_limits_frame, text="Max hits au total:").pack(side=tk.LEFT, padx=(0,5))
+        ttk.Spinbox(hits_limits_frame, from_=0, to=10**9, increment=100, textvariable=self.max_hits_total_var, width=8).pack(side=tk.LEFT, padx=(0,15))
+        ttk.Label(hits_limits_frame, text="Max hits par fichier:").pack(side=tk.LEFT, padx=(0,5))
+        ttk.Spinbox(hits_limits_frame, from_=0, to=10**9, increment=1, textvariable=self.max_hits_per_file_var, width=8).pack(side=tk.LEFT)
+        ttk.Label(scrollable_frame_recherche, text="0 = illimité. 'Fichiers contenant' arrête la lecture d'un fichier au premier hit ; la limite totale arrête toute la recherche.", font=(self.DEFAULT_FONT_FAMILY, max(6, self.DEFAULT_FONT_SIZE - 2) )).pack(anchor='w', pady=(0,10))
 
         ttk.Label(scrollable_frame_recherche, text="Nombre max de processus de recherche (workers):").pack(anchor='w', pady=(10,0))
         max_cpu_workers = os.cpu_count() or 1
         self.workers_spinbox = ttk.Spinbox(scrollable_frame_recherche, from_=1, to=max(32, max_cpu_workers * 2), increment=1, textvariable=self.max_workers_var, width=5)
         self.workers_spinbox.pack(anchor='w', pady=(0,2))
         explanation_text = "Plus de workers peuvent accélérer la recherche sur CPU multi-cœurs mais consomment plus de ressources.\nUn nombre excessif peut être contre-productif. N'affecte pas vos fichiers."
-        ttk.Label(scrollable_frame_recherche, text=explanation_text, font=(self.DEFAULT_FONT_FAMILY, max(6, self.DEFAULT_FONT_SIZE - 2) )).pack(anchor='w', pady=(0,10))
+        ttk.Label(scrollable_frame_recherche, text=explanation_text, font=(self.DEFAULT_FONT_FAMILY, max(6, self.DEFAULT_FONT_SIZE - 2) )).pack(anchor='w', pady=(0,2))
+        self.auto_tune_workers_checkbutton = ttk.Checkbutton(scrollable_frame_recherche, text="Ajuster automatiquement selon le débit mesuré", variable=self.auto_tune_workers_var)
+        self.auto_tune_workers_checkbutton.pack(anchor='w', pady=(2,0))
+        ttk.Label(scrollable_frame_recherche, text="La valeur ci-dessus sert de point de départ. Les lectures simultanées restent limitées par support\n(disque dur: 2, réseau: 4, SSD: sans limite).", font=(self.DEFAULT_FONT_FAMILY, max(6, self.DEFAULT_FONT_SIZE - 2) )).pack(anchor='w', padx=(20,0), pady=(0,10))
+        self.search_service_checkbutton = ttk.Checkbutton(scrollable_frame_recherche, text="Utiliser le service de recherche local", variable=self.search_service_var)
+        self.search_service_checkbutton.pack(anchor='w', pady=(10,0))
+        search_service_frame = ttk.Frame(scrollable_frame_recherche)
+        search_service_frame.pack(anchor='w', padx=(20,0), pady=(2,0))
+        ttk.Label(search_service_frame, text=f"Port ({DAEMON_HOST}):").pack(side=tk.LEFT, padx=(0,5))
+        ttk.Spinbox(search_service_frame, from_=1, to=65535, increment=1, textvariable=self.search_service_port_var, width=7).pack(side=tk.LEFT)
+        ttk.Label(scrollable_frame_recherche, text="Service lancé par 'python DLU_V3.py --serve [port]' : workers déjà démarrés et partagés équitablement\nentre plusieurs fenêtres. Recherche locale si le service ne répond pas. Accès réservé aux clients qui présentent le jeton\nsearch_service_token de config.json (créé au démarrage) ; search_service_roots y limite les dossiers servis.", font=(self.DEFAULT_FONT_FAMILY, max(6, self.DEFAULT_FONT_SIZE - 2) )).pack(anchor='w', padx=(20,0), pady=(0,10))
+        self.distributed_search_checkbutton = ttk.Checkbutton(scrollable_frame_recherche, text="Recherche distribuée sur plusieurs nœuds", variable=self.distributed_search_var)
+        self.distributed_search_checkbutton.pack(anchor='w', pady=(10,0))
+        search_nodes_frame = ttk.Frame(scrollable_frame_recherche)
+        search_nodes_frame.pack(anchor='w', padx=(20,0), pady=(2,0))
+        ttk.Label(search_nodes_frame, text="Nœuds (hote:port, ...):").pack(side=tk.LEFT, padx=(0,5))
+        ttk.Entry(search_nodes_frame, textvariable=self.search_nodes_var, width=40).pack(side=tk.LEFT)
+        ttk.Label(scrollable_frame_recherche, text="Chaque nœud ('python DLU_V3.py --serve port 0.0.0.0') parcourt sa part des sous-dossiers, avec les mêmes chemins.\nDoublons et statistiques sont fusionnés ici ; la part d'un nœud en panne passe au suivant.\nChaque nœud doit avoir le même search_service_token que cette machine dans son config.json.", font=(self.DEFAULT_FONT_FAMILY, max(6, self.DEFAULT_FONT_SIZE - 2) )).pack(anchor='w', padx=(20,0), pady=(0,10))
+        self.read_ahead_checkbutton = ttk.Checkbutton(scrollable_frame_recherche, text="Lecture anticipée (threads d'E/S + mémoire partagée)", variable=self.read_ahead_var)
+        self.read_ahead_checkbutton.pack(anchor='w', pady=(10,0))
+        prefetch_frame = ttk.Frame(scrollable_frame_recherche)
+        prefetch_frame.pack(anchor='w', padx=(20,0), pady=(2,0))
+        ttk.Label(prefetch_frame, text=f"Blocs de {READ_AHEAD_BLOCK_SIZE // (1024 * 1024)} Mo en avance:").pack(side=tk.LEFT, padx=(0,5))
+        self.prefetch_depth_spinbox = ttk.Spinbox(prefetch_frame, from_=1, to=MAX_PREFETCH_DEPTH, increment=1, textvariable=self.prefetch_depth_var, width=5)
+        self.prefetch_depth_spinbox.pack(side=tk.LEFT)
+        ttk.Label(scrollable_frame_recherche, text="Utile sur disques durs et partages réseau : le disque lit pendant que les workers scannent.\nLes fichiers .csv gardent la lecture classique.", font=(self.DEFAULT_FONT_FAMILY, max(6, self.DEFAULT_FONT_SIZE - 2) )).pack(anchor='w', padx=(20,0), pady=(0,10))
+
+        self.stream_export_checkbutton = ttk.Checkbutton(scrollable_frame_recherche, text="Exporter les hits pendant la recherche", variable=self.stream_export_var)
+        self.stream_export_checkbutton.pack(anchor='w', pady=(10,0))
+        stream_export_frame = ttk.Frame(scrollable_frame_recherche)
+        stream_export_frame.pack(fill='x', padx=(20,0), pady=(2,0))
+        self.stream_export_entry = ttk.Entry(stream_export_frame, textvariable=self.stream_export_path_var, width=40)
+        self.stream_export_entry.pack(side=tk.LEFT, fill='x', expand=True, padx=(0,5))
+        ttk.Button(stream_export_frame, text="Choisir...", command=self._choose_stream_export_path).pack(side=tk.LEFT)
+        ttk.Label(scrollable_frame_recherche, text="Format selon l'extension : .jsonl ou .csv, ajouter .gz pour compresser (ex: hits.jsonl.gz).", font=(self.DEFAULT_FONT_FAMILY, max(6, self.DEFAULT_FONT_SIZE - 2) )).pack(anchor='w', padx=(20,0), pady=(0,10))
+
+        ttk.Label(scrollable_frame_recherche, text="Lot de requêtes:").pack(anchor='w', pady=(10,0))
+        query_batch_frame = ttk.Frame(scrollable_frame_recherche)
+        query_batch_frame.pack(anchor='w', pady=(2,0))
+        self.query_batch_combo = ttk.Combobox(query_batch_frame, textvariable=self.query_batch_name_var, values=sorted(self.query_batches), width=25)
+        self.query_batch_combo.pack(side=tk.LEFT, padx=(0,5))
+        ttk.Button(query_batch_frame, text="Ajouter la recherche courante", command=self._add_current_query_to_batch).pack(side=tk.LEFT, padx=(0,5))
+        ttk.Button(query_batch_frame, text="Lancer", command=self.lancer_lot_requetes).pack(side=tk.LEFT, padx=(0,5))
+        ttk.Button(query_batch_frame, text="Supprimer", command=self._delete_query_batch).pack(side=tk.LEFT)
+        ttk.Label(scrollable_frame_recherche, text="Chaque requête garde ses options (casse, accents, approchée, max hits par fichier). Un lot lit une seule fois\nles fichiers nouveaux ou modifiés depuis sa dernière exécution ; résultats par requête et summary.json dans dlu_batches/.\nEn tâche planifiée : 'python DLU_V3.py --batch NOM'.", font=(self.DEFAULT_FONT_FAMILY, max(6, self.DEFAULT_FONT_SIZE - 2) )).pack(anchor='w', pady=(0,10))
+
+        context_frame = ttk.Frame(scrollable_frame_recherche)
+        context_frame.pack(anchor='w', pady=(10,0))
+        ttk.Label(context_frame, text="Lignes de contexte autour d'un hit:").pack(side=tk.LEFT, padx=(0,5))
+        ttk.Spinbox(context_frame, from_=0, to=1000, increment=1, textvariable=self.context_lines_var, width=5).pack(side=tk.LEFT)
+        ttk.Label(scrollable_frame_recherche, text="Double-cliquer sur un hit affiche les lignes voisines sans rouvrir tout le fichier.\nSans offset connu, un index des lignes est créé au premier accès (dossier dlu_index).", font=(self.DEFAULT_FONT_FAMILY, max(6, self.DEFAULT_FONT_SIZE - 2) )).pack(anchor='w', padx=(20,0), pady=(0,10))
+
+        self.checkpoint_checkbutton = ttk.Checkbutton(scrollable_frame_recherche, text="Points de reprise (reprendre une recherche interrompue)", variable=self.checkpoint_var)
+        self.checkpoint_checkbutton.pack(anchor='w', pady=(10,0))
+        ttk.Label(scrollable_frame_recherche, text="Relancer la même recherche saute les fichiers déjà traités. Avec la lecture anticipée,\nun gros fichier entamé reprend à son dernier bloc scanné.", font=(self.DEFAULT_FONT_FAMILY, max(6, self.DEFAULT_FONT_SIZE - 2) )).pack(anchor='w', padx=(20,0), pady=(0,10))
+
         ttk.Label(scrollable_frame_recherche, text="Dossiers/Fichiers à exclure (noms ou parties de chemin, séparés par virgules):").pack(anchor='w', pady=(10,2))
         self.excluded_paths_entry = ttk.Entry(scrollable_frame_recherche, textvariable=self.excluded_paths_str_var, width=50)
         self.excluded_paths_entry.pack(fill='x', pady=(0,10))
@@ -448,18 +2467,50 @@ class RechercheDBAppTk:
         self.title_label.bind("<B1-Motion>", self._on_drag_title_bar)
 
     def _put_on_ui_queue(self, *args):
-        """Helper pour mettre des messages dans la file d'attente de l'UI."""
+        """Helper pour mettre des messages dans la file d'attente de l'UI. Réveille Tk seulement si aucun
+        traitement n'est déjà prévu : une rafale de hits ne coûte qu'un événement."""
         self.ui_queue.put(args)
+        with self._ui_wakeup_lock:
+            if self._ui_wakeup_pending:
+                return
+            self._ui_wakeup_pending = True
+        try:
+            self.master.event_generate("<<UIQueue>>", when="tail") # Transmis au thread de Tk
+        except (RuntimeError, tk.TclError):
+            # Boucle Tk pas encore démarrée ou fenêtre fermée : le prochain message retentera
+            with self._ui_wakeup_lock:
+                self._ui_wakeup_pending = False
+
+    def _on_ui_wakeup(self, event=None):
+        """Traite la file tout de suite, ou à la fin de l'intervalle en cours si l'UI vient d'être rafraîchie."""
+        delay_ms = int(self.UI_FRAME_BUDGET_MS - (time.perf_counter() - self._ui_last_flush) * 1000)
+        if delay_ms > 0:
+            self.master.after(delay_ms, self._process_ui_queue)
+        else:
+            self._process_ui_queue()
 
     def _process_ui_queue(self):
-        """Traite les messages de la file d'attente pour mettre à jour l'UI dans le thread principal."""
+        """Traite les messages de la file d'attente pour mettre à jour l'UI dans le thread principal.
+        Le traitement s'arrête après un intervalle de rafraîchissement ; le reste est repris à l'intervalle suivant."""
+        with self._ui_wakeup_lock:
+            self._ui_wakeup_pending = False # Avant de vider la file : un message arrivé ensuite redemandera un réveil
+        self._ui_last_flush = time.perf_counter()
+        deadline = self._ui_last_flush + self.UI_FRAME_BUDGET_MS / 1000
+        scroll_to_end = False
         try:
             while True:
+                if time.perf_counter() > deadline:
+                    with self._ui_wakeup_lock:
+                        self._ui_wakeup_pending = True
+                    self.master.after(self.UI_FRAME_BUDGET_MS, self._process_ui_queue)
+                    break
                 message = self.ui_queue.get_nowait()
                 msg_type = message[0]
 
                 if msg_type == "append_text":
-                    _, text_content, tag_name = message # tag_name peut être "new_item", "error_item", ou None
+                    text_content, tag_name = message[1], message[2] # tag_name peut être "new_item", "error_item", ou None
+                    if len(message) > 3: # Emplacement du hit (fichier, ligne, offset) pour l'affichage du contexte
+                        self.hit_locations[int(self.resultats_text.index('end-1c').split('.')[0])] = message[3]
                     self.resultats_text.configure(state='normal')
                     if tag_name == "new_item" and text_content.startswith("[NEW] "):
                         prefix = "[NEW] "
@@ -470,12 +2521,15 @@ class RechercheDBAppTk:
                         self.resultats_text.insert(tk.END, text_content + "\n", tag_name)
                     else: # Pour les messages sans tag spécifique (style par défaut)
                         self.resultats_text.insert(tk.END, text_content + "\n")
-                    self.resultats_text.see(tk.END) # Faire défiler vers la fin
+                    scroll_to_end = True
                     self.resultats_text.configure(state='disabled')
                 elif msg_type == "clear_text":
+                    self.hit_locations.clear()
                     self.resultats_text.configure(state='normal')
                     self.resultats_text.delete('1.0', tk.END)
                     self.resultats_text.configure(state='disabled')
+                elif msg_type == "context_lines":
+                    self._fill_context_window(*message[1:])
                 elif msg_type == "progress_update":
                     _, value, max_val = message
                     if self.progress_bar['maximum'] != max_val:
@@ -498,8 +2552,8 @@ class RechercheDBAppTk:
                         self.results_context_menu.entryconfigure(2, label=f"Doublons évités: {self.search_duplicates_count}", state=tk.NORMAL if self.search_duplicates_count >= 0 else tk.DISABLED)
         except queue.Empty:
             pass # Normal, la file est vide
-        finally:
-            self.master.after(100, self._process_ui_queue) # Planifier la prochaine vérification
+        if scroll_to_end:
+            self.resultats_text.see(tk.END) # Faire défiler vers la fin, une fois par lot
 
     def _on_press_title_bar(self, event):
         """Enregistre la position du clic initial sur la barre de titre."""
@@ -524,6 +2578,8 @@ class RechercheDBAppTk:
     def _toggle_view(self):
         """Bascule entre la vue principale et la vue des paramètres."""
         if self.current_view_frame == self.main_view_frame:
+            if self.settings_view_frame is None:
+                self._build_settings_view()
             self.main_view_frame.pack_forget()
             self.settings_view_frame.pack(fill=tk.BOTH, expand=True)
             self.current_view_frame = self.settings_view_frame
@@ -615,6 +2671,33 @@ class RechercheDBAppTk:
             parsed_extensions.append(ext)
         return list(set(parsed_extensions)) # Supprime les doublons
 
+    def _get_prefetch_depth(self):
+        """Profondeur de prefetch valide (entre 1 et MAX_PREFETCH_DEPTH blocs)."""
+        try:
+            return min(MAX_PREFETCH_DEPTH, max(1, self.prefetch_depth_var.get()))
+        except tk.TclError:
+            self.prefetch_depth_var.set(DEFAULT_PREFETCH_DEPTH)
+            return DEFAULT_PREFETCH_DEPTH
+
+    def _get_output_mode(self):
+        return self.OUTPUT_MODES.get(self.output_mode_var.get(), "lines")
+
+    def _get_fuzzy_distance(self):
+        """Nombre d'erreurs tolérées valide (1 à MAX_FUZZY_DISTANCE)."""
+        try:
+            return min(MAX_FUZZY_DISTANCE, max(1, self.fuzzy_distance_var.get()))
+        except tk.TclError:
+            self.fuzzy_distance_var.set(DEFAULT_FUZZY_DISTANCE)
+            return DEFAULT_FUZZY_DISTANCE
+
+    def _get_hits_limit(self, limit_var):
+        """Limite de hits valide (0 = illimité)."""
+        try:
+            return max(0, limit_var.get())
+        except tk.TclError:
+            limit_var.set(0)
+            return 0
+
     def _apply_search_settings(self):
         """Applique les paramètres de recherche modifiés (extensions, filtrage doublons)."""
         # Extensions
@@ -760,6 +2843,83 @@ class RechercheDBAppTk:
         self.results_context_menu.tk_popup(event.x_root, event.y_root)
 
 
+    def _get_context_lines(self):
+        """Nombre de lignes de contexte valide (0 à 1000 de part et d'autre du hit)."""
+        try:
+            return min(1000, max(0, self.context_lines_var.get()))
+        except tk.TclError:
+            self.context_lines_var.set(DEFAULT_CONTEXT_LINES)
+            return DEFAULT_CONTEXT_LINES
+
+    def _show_hit_context(self, event):
+        """Double-clic sur un hit : affiche les lignes qui l'entourent sans relire le fichier."""
+        widget_line = int(self.resultats_text.index(f"@{event.x},{event.y}").split('.')[0])
+        location = self.hit_locations.get(widget_line)
+        if location and source_reader_for(location[0]) is read_sqlite_hits:
+            # Le hit contient déjà toute la ligne de la table ; le fichier n'a pas de lignes de texte
+            self._put_on_ui_queue("status_label", "Pas de contexte pour une base SQLite (hit = ligne complète de la table).")
+        elif location:
+            self._load_context(*location)
+        return "break" # Pas de sélection de mot par défaut
+
+    def _load_context(self, fichier, ligne, offset=None):
+        """Lit le contexte dans un thread : le premier accès sans offset peut construire l'index des lignes."""
+        self._open_context_window(fichier, ligne)
+        self._put_on_ui_queue("status_label", f"Lecture du contexte: {os.path.basename(fichier)}, L{ligne}")
+        context_lines = self._get_context_lines()
+
+        def worker():
+            try:
+                lines = read_context_lines(fichier, ligne, offset, before=context_lines, after=context_lines)
+                self._put_on_ui_queue("context_lines", fichier, ligne, lines, None)
+            except Exception as e:
+                self._put_on_ui_queue("context_lines", fichier, ligne, [], str(e))
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _open_context_window(self, fichier, ligne):
+        if not (self.context_window and self.context_window.winfo_exists()):
+            self.context_window = tk.Toplevel(self.master, bg=self.COLOR_BG_PRIMARY)
+            self.context_window.geometry("900x400")
+            goto_frame = ttk.Frame(self.context_window)
+            goto_frame.pack(fill='x', padx=10, pady=(10,5))
+            ttk.Label(goto_frame, text="Aller à la ligne:").pack(side=tk.LEFT, padx=(0,5))
+            self.context_goto_var = tk.IntVar(value=ligne)
+            ttk.Spinbox(goto_frame, from_=1, to=10**12, increment=1, textvariable=self.context_goto_var, width=12).pack(side=tk.LEFT, padx=(0,5))
+            ttk.Button(goto_frame, text="Aller", command=self._goto_context_line).pack(side=tk.LEFT)
+            self.context_text = scrolledtext.ScrolledText(self.context_window, wrap=tk.NONE, state='disabled',
+                                                          background=self.COLOR_BG_SECONDARY,
+                                                          foreground=self.COLOR_TEXT_PRIMARY,
+                                                          insertbackground=self.COLOR_TEXT_PRIMARY,
+                                                          relief=tk.FLAT, borderwidth=1)
+            self.context_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0,10))
+            self.context_text.tag_configure("new_item", foreground=self.COLOR_TEXT_ACCENT)
+        self.context_file = fichier
+        self.context_goto_var.set(ligne)
+        self.context_window.title(f"Contexte - {os.path.basename(fichier)}")
+        self.context_window.lift()
+
+    def _goto_context_line(self):
+        try:
+            ligne = max(1, self.context_goto_var.get())
+        except tk.TclError:
+            return
+        self._load_context(self.context_file, ligne) # Sans offset : passe par l'index des lignes
+
+    def _fill_context_window(self, fichier, ligne, lines, error):
+        if not (self.context_window and self.context_window.winfo_exists()) or fichier != self.context_file:
+            return
+        self.context_text.configure(state='normal')
+        self.context_text.delete('1.0', tk.END)
+        if error:
+            self.context_text.insert(tk.END, f"Erreur lecture {os.path.basename(fichier)}: {error}\n")
+        elif not lines:
+            self.context_text.insert(tk.END, f"La ligne {ligne} dépasse la fin du fichier.\n")
+        width = len(str(lines[-1][0])) if lines else 0
+        for numero, texte in lines:
+            self.context_text.insert(tk.END, f"{numero:>{width}}  {texte}\n", "new_item" if numero == ligne else None)
+        self.context_text.configure(state='disabled')
+        self._put_on_ui_queue("status_label", f"Contexte: {os.path.basename(fichier)}, L{ligne}")
+
     def _save_results(self):
         """Sauvegarde le contenu de la zone de résultats dans un fichier."""
         results_content = self.resultats_text.get("1.0", tk.END).strip()
@@ -782,10 +2942,22 @@ class RechercheDBAppTk:
                 self._put_on_ui_queue("status_label", f"Erreur lors de la sauvegarde: {e}")
                 print(f"Erreur de sauvegarde: {e}")
 
+    def _choose_stream_export_path(self):
+        """Choisit le fichier d'export continu des hits."""
+        filepath = filedialog.asksaveasfilename(
+            defaultextension=".jsonl",
+            filetypes=[("JSON Lines", "*.jsonl"), ("JSON Lines compressé", "*.jsonl.gz"), ("CSV", "*.csv"), ("CSV compressé", "*.csv.gz"), ("Tous les fichiers", "*.*")],
+            title="Exporter les hits vers"
+        )
+        if filepath:
+            self.stream_export_path_var.set(filepath)
+            self.stream_export_var.set(True)
+
     def _save_app_settings(self):
         """Sauvegarde les paramètres actuels de l'application dans un fichier JSON."""
         settings_to_save = {
             "current_theme_name": self.current_theme_name,
+            "root_folders": self.dossiers_parents,
             # Les couleurs et polices des résultats sont maintenant spécifiques au thème,
             # mais si on veut les sauvegarder comme des overrides utilisateur:
             "font_family_results": self.FONT_FAMILY_RESULTS,
@@ -797,11 +2969,36 @@ class RechercheDBAppTk:
             "current_max_workers": self.current_max_workers,
             "current_excluded_paths_list": self.current_excluded_paths_list,
             "case_sensitive_search": self.case_sensitive_var.get(),
+            "content_sniffing_enabled": self.content_sniffing_var.get(),
+            "auto_tune_workers": self.auto_tune_workers_var.get(),
+            "exact_field_enabled": self.exact_field_var.get(),
+            "exact_field_column": self.exact_field_column_var.get().strip(),
+            "read_ahead_enabled": self.read_ahead_var.get(),
+            "prefetch_depth": self._get_prefetch_depth(),
+            "stream_export_enabled": self.stream_export_var.get(),
+            "stream_export_path": self.stream_export_path_var.get().strip(),
+            "output_mode": self._get_output_mode(),
+            "max_hits_total": self._get_hits_limit(self.max_hits_total_var),
+            "max_hits_per_file": self._get_hits_limit(self.max_hits_per_file_var),
+            "checkpoint_enabled": self.checkpoint_var.get(),
+            "skip_identical_files": self.skip_identical_files_var.get(),
+            "accent_insensitive": self.accent_insensitive_var.get(),
+            "fuzzy_enabled": self.fuzzy_var.get(),
+            "fuzzy_distance": self._get_fuzzy_distance(),
+            "use_search_service": self.search_service_var.get(),
+            "search_service_port": self._get_search_service_port(),
+            "distributed_search": self.distributed_search_var.get(),
+            "search_nodes": self.search_nodes_var.get().strip(),
+            "context_lines": self._get_context_lines(),
+            "query_batches": self.query_batches,
             # "current_language": self.current_language # Si la fonctionnalité de langue est ajoutée
         }
         try:
-            with open(self.CONFIG_FILE_PATH, "w", encoding="utf-8") as f:
-                json.dump(settings_to_save, f, indent=4)
+            with _CONFIG_LOCK:
+                existing = _read_config() # Jeton et dossiers autorisés du service : écrits à la main ou par le service
+                settings_to_save.update((key, existing[key]) for key in SERVICE_CONFIG_KEYS if key in existing)
+                with open(self.CONFIG_FILE_PATH, "w", encoding="utf-8") as f:
+                    json.dump(settings_to_save, f, indent=4)
         except Exception as e:
             print(f"Erreur lors de la sauvegarde des paramètres: {e}")
 
@@ -835,6 +3032,35 @@ class RechercheDBAppTk:
                 self.max_workers_var.set(self.current_max_workers)
                 self.excluded_paths_str_var.set(",".join(self.current_excluded_paths_list))
                 self.case_sensitive_var.set(self.case_sensitive_search)
+                self.selected_theme_var.set(self.current_theme_name)
+                self.selected_font_family_var.set(self.FONT_FAMILY_RESULTS)
+                self.selected_font_size_var.set(self.FONT_SIZE_RESULTS)
+                self.new_item_color_var.set(self.COLOR_RESULT_NEW)
+                self.error_item_color_var.set(self.COLOR_RESULT_ERROR)
+                self.dossiers_parents = [d for d in loaded_settings.get("root_folders", []) if os.path.isdir(d)]
+                self.content_sniffing_var.set(loaded_settings.get("content_sniffing_enabled", False))
+                self.auto_tune_workers_var.set(loaded_settings.get("auto_tune_workers", True))
+                self.exact_field_var.set(loaded_settings.get("exact_field_enabled", False))
+                self.exact_field_column_var.set(loaded_settings.get("exact_field_column", "1"))
+                self.read_ahead_var.set(loaded_settings.get("read_ahead_enabled", False))
+                self.prefetch_depth_var.set(loaded_settings.get("prefetch_depth", DEFAULT_PREFETCH_DEPTH))
+                self.stream_export_var.set(loaded_settings.get("stream_export_enabled", False))
+                self.stream_export_path_var.set(loaded_settings.get("stream_export_path", ""))
+                saved_output_mode = loaded_settings.get("output_mode", "lines")
+                self.output_mode_var.set(next((label for label, mode in self.OUTPUT_MODES.items() if mode == saved_output_mode), "Lignes trouvées"))
+                self.max_hits_total_var.set(loaded_settings.get("max_hits_total", 0))
+                self.max_hits_per_file_var.set(loaded_settings.get("max_hits_per_file", 0))
+                self.checkpoint_var.set(loaded_settings.get("checkpoint_enabled", False))
+                self.skip_identical_files_var.set(loaded_settings.get("skip_identical_files", False))
+                self.accent_insensitive_var.set(loaded_settings.get("accent_insensitive", False))
+                self.fuzzy_var.set(loaded_settings.get("fuzzy_enabled", False))
+                self.fuzzy_distance_var.set(loaded_settings.get("fuzzy_distance", DEFAULT_FUZZY_DISTANCE))
+                self.search_service_var.set(loaded_settings.get("use_search_service", False))
+                self.search_service_port_var.set(loaded_settings.get("search_service_port", DEFAULT_DAEMON_PORT))
+                self.distributed_search_var.set(loaded_settings.get("distributed_search", False))
+                self.search_nodes_var.set(loaded_settings.get("search_nodes", ""))
+                self.query_batches = loaded_settings.get("query_batches", {})
+                self.context_lines_var.set(loaded_settings.get("context_lines", DEFAULT_CONTEXT_LINES))
                 # self.current_language = loaded_settings.get("current_language", self.current_language)
                 # if hasattr(self, 'translations'): # Si la gestion de langue est active
                 #     self.translations = self.languages.get(self.current_language, self.languages["Français"])
@@ -910,6 +3136,18 @@ class RechercheDBAppTk:
         self._save_app_settings()
         self.master.destroy()
 
+    def _setup_drag_and_drop(self):
+        """Active le glisser-déposer si tkinterdnd2 est installé (chargé dans la fenêtre Tk existante)."""
+        try:
+            from tkinterdnd2 import DND_FILES, TkinterDnD
+            TkinterDnD._require(self.master)
+        except (ImportError, RuntimeError, tk.TclError):
+            print("tkinterdnd2 non trouvé. La fonctionnalité de glisser-déposer ne sera pas disponible.")
+            print("Veuillez l'installer avec : pip install tkinterdnd2")
+            return
+        self.root_container.drop_target_register(DND_FILES)
+        self.root_container.dnd_bind('<<Drop>>', self._handle_dnd_folder_drop)
+
     def _handle_dnd_folder_drop(self, event):
         """Gère le dépôt d'un fichier/dossier sur l'application."""
         # event.data est une chaîne, potentiellement une liste de chemins formatée par Tcl
@@ -918,29 +3156,46 @@ class RechercheDBAppTk:
         try:
             dropped_paths = self.master.tk.splitlist(event.data)
             if dropped_paths:
-                # On prend le premier élément qui est un dossier
-                for path_item in dropped_paths:
-                    # Nettoyer les éventuelles accolades restantes si splitlist ne les a pas gérées
-                    # (normalement, splitlist devrait bien gérer la liste Tcl)
-                    # path_item = path_item.strip('{}') # Généralement pas nécessaire avec splitlist
-                    if os.path.isdir(path_item):
-                        self.dossier_parent = path_item
-                        self._put_on_ui_queue("status_label", f"Dossier (D&D): {os.path.basename(self.dossier_parent)}")
-                        return # On a trouvé un dossier, on s'arrête
-                self._put_on_ui_queue("status_label", "Glisser-déposer : Aucun dossier valide trouvé.")
+                # Tous les dossiers déposés sont ajoutés aux racines de recherche
+                # (splitlist gère déjà les accolades de la liste Tcl)
+                added = [path_item for path_item in dropped_paths if os.path.isdir(path_item) and self._add_root_folder(path_item)]
+                if added:
+                    self._put_on_ui_queue("status_label", f"Dossiers (D&D): {self._describe_root_folders()}")
+                    self._save_app_settings()
+                    return
+                self._put_on_ui_queue("status_label", "Glisser-déposer : Aucun nouveau dossier valide trouvé.")
         except Exception as e:
             print(f"Erreur lors du traitement du glisser-déposer : {e}")
 
+    def _add_root_folder(self, folder):
+        """Ajoute un dossier racine s'il n'est pas déjà présent. Retourne True si ajouté."""
+        normalized = os.path.normcase(os.path.abspath(folder))
+        if any(os.path.normcase(os.path.abspath(existing)) == normalized for existing in self.dossiers_parents):
+            return False
+        self.dossiers_parents.append(folder)
+        return True
+
+    def _describe_root_folders(self):
+        names = [os.path.basename(os.path.normpath(d)) or d for d in self.dossiers_parents]
+        if len(names) > 3:
+            return ", ".join(names[:3]) + f" (+{len(names) - 3})"
+        return ", ".join(names)
+
+    def _clear_root_folders(self):
+        self.dossiers_parents = []
+        self._put_on_ui_queue("status_label", "Aucun dossier sélectionné.")
+        self._save_app_settings()
+
     def choisir_dossier(self):
-        folder = filedialog.askdirectory(title="Choisir le dossier principal")
+        folder = filedialog.askdirectory(title="Ajouter un dossier à la recherche")
         if folder:
-            self.dossier_parent = folder
-            # Optionnel: afficher le dossier choisi dans un label ou titre
-            self._put_on_ui_queue("status_label", f"Dossier: {os.path.basename(self.dossier_parent)}")
+            self._add_root_folder(folder)
+            self._put_on_ui_queue("status_label", f"Dossiers: {self._describe_root_folders()}")
+            self._save_app_settings()
 
     def lancer_recherche(self):
         batabase = self.batabase_input.get()
-        if self.dossier_parent and batabase and batabase != self.PLACEHOLDER_TEXT_DB_INPUT:
+        if self.dossiers_parents and batabase and batabase != self.PLACEHOLDER_TEXT_DB_INPUT:
             # Réinitialiser les compteurs et le menu contextuel
             self.search_hits_count = 0
             self.search_errors_count = 0
@@ -955,23 +3210,302 @@ class RechercheDBAppTk:
             self._put_on_ui_queue("status_label", "Recherche en cours...")
 
             # Exécuter la recherche dans un thread séparé pour ne pas bloquer l'UI
-            # Ce thread utilisera ProcessPoolExecutor pour les tâches de fichiers
-            import threading
-            thread = threading.Thread(target=self._dossiersDb_recherche_worker, 
-                                      args=(self.dossier_parent, 
-                                            batabase, 
-                                            list(self.current_extensions_list),
-                                            self.filter_duplicates_enabled,
-                                            self.current_max_workers,
-                                            list(self.current_excluded_paths_list),
-                                            self.case_sensitive_var.get()))
+            # Ce thread utilisera ProcessPoolExecutor pour les tâches de fichiers (ou le service local s'il est activé)
+            worker_args = (list(self.dossiers_parents), 
+                           batabase, 
+                           list(self.current_extensions_list),
+                           self.filter_duplicates_enabled,
+                           self.current_max_workers,
+                           list(self.current_excluded_paths_list),
+                           self.case_sensitive_var.get())
+            worker_kwargs = {"content_sniffing": self.content_sniffing_var.get(),
+                             "auto_tune_workers": self.auto_tune_workers_var.get(),
+                             "exact_field_column": self.exact_field_column_var.get().strip() if self.exact_field_var.get() else None,
+                             "read_ahead_depth": self._get_prefetch_depth() if self.read_ahead_var.get() else 0,
+                             "export_path": self.stream_export_path_var.get().strip() if self.stream_export_var.get() else None,
+                             "output_mode": self._get_output_mode(),
+                             "max_hits_total": self._get_hits_limit(self.max_hits_total_var),
+                             "max_hits_per_file": self._get_hits_limit(self.max_hits_per_file_var),
+                             "checkpoint_enabled": self.checkpoint_var.get(),
+                             "skip_identical_files": self.skip_identical_files_var.get(),
+                             "accent_insensitive": self.accent_insensitive_var.get(),
+                             "fuzzy_distance": self._get_fuzzy_distance() if self.fuzzy_var.get() else 0}
+            noeuds = None
+            if self.distributed_search_var.get():
+                try:
+                    noeuds = parse_search_nodes(self.search_nodes_var.get())
+                except ValueError as e:
+                    self._put_on_ui_queue("append_text", f"[ERREUR] Recherche distribuée: {str(e)}, recherche locale.", "error_item")
+            if noeuds:
+                thread = threading.Thread(target=self._recherche_distribuee, args=(noeuds, worker_args, worker_kwargs))
+            elif self.search_service_var.get():
+                thread = threading.Thread(target=self._recherche_via_service, args=(self._get_search_service_port(), worker_args, worker_kwargs))
+            else:
+                thread = threading.Thread(target=self._dossiersDb_recherche_worker, args=worker_args, kwargs=worker_kwargs)
             thread.daemon = True # Permet à l'app de quitter même si le thread tourne
             thread.start()
         else:
             self._put_on_ui_queue("clear_text")
-            self._put_on_ui_queue("append_text", "Veuillez sélectionner un dossier et entrer une donnée à rechercher.", None)
+            self._put_on_ui_queue("append_text", "Veuillez ajouter au moins un dossier et entrer une donnée à rechercher.", None)
             self._put_on_ui_queue("status_label", "Prêt")
 
+    def _add_current_query_to_batch(self):
+        """Ajoute le terme saisi, avec ses options de recherche actuelles, au lot nommé (créé au besoin)."""
+        nom_lot = self.query_batch_name_var.get().strip()
+        terme = self.batabase_input.get()
+        if not nom_lot or not terme or terme == self.PLACEHOLDER_TEXT_DB_INPUT:
+            self._put_on_ui_queue("status_label", "Nommer le lot et saisir une donnée à rechercher.")
+            return
+        requete = {"term": terme, "case_sensitive": self.case_sensitive_var.get(), "accent_insensitive": self.accent_insensitive_var.get(),
+                   "fuzzy_distance": self._get_fuzzy_distance() if self.fuzzy_var.get() else 0,
+                   "max_hits_per_file": self._get_hits_limit(self.max_hits_per_file_var)}
+        requetes = self.query_batches.setdefault(nom_lot, [])
+        if query_batch_key(requete) not in {query_batch_key(r) for r in requetes}:
+            requetes.append(requete)
+        self.query_batch_combo.configure(values=sorted(self.query_batches))
+        self._put_on_ui_queue("status_label", f"Lot '{nom_lot}' : {len(requetes)} requête(s)")
+        self._save_app_settings()
+
+    def _delete_query_batch(self):
+        nom_lot = self.query_batch_name_var.get().strip()
+        if self.query_batches.pop(nom_lot, None) is not None:
+            self.query_batch_name_var.set("")
+            self.query_batch_combo.configure(values=sorted(self.query_batches))
+            self._put_on_ui_queue("status_label", f"Lot '{nom_lot}' supprimé")
+            self._save_app_settings()
+
+    def lancer_lot_requetes(self):
+        nom_lot = self.query_batch_name_var.get().strip()
+        requetes = self.query_batches.get(nom_lot)
+        if not requetes or not self.dossiers_parents:
+            self._put_on_ui_queue("status_label", "Choisir un lot enregistré et au moins un dossier.")
+            return
+        self._put_on_ui_queue("clear_text")
+        self._put_on_ui_queue("progress_update", 0, 100)
+        thread = threading.Thread(target=self._lot_requetes_worker,
+                                  args=(nom_lot, [dict(r) for r in requetes], list(self.dossiers_parents), list(self.current_extensions_list),
+                                        self.current_max_workers, list(self.current_excluded_paths_list)),
+                                  kwargs={"content_sniffing": self.content_sniffing_var.get()})
+        thread.daemon = True
+        thread.start()
+
+    def _recherche_via_service(self, port, worker_args, worker_kwargs):
+        """Confie la recherche au service local et relaie ses messages ; recherche locale s'il ne répond pas."""
+        dossiers, terme, extensions, filtrer_doublons, _, exclusions, sensible_casse = worker_args
+        output_mode = worker_kwargs.get("output_mode", "lines")
+        export_path = worker_kwargs.get("export_path")
+        # Le service n'écrit aucun fichier pour le client : l'export est écrit ici à partir des hits reçus
+        options = {key: value for key, value in worker_kwargs.items() if key not in ("export_path", "checkpoint_enabled")}
+        try:
+            conn = socket.create_connection((DAEMON_HOST, port), timeout=DAEMON_CONNECT_TIMEOUT)
+        except OSError as e:
+            self._put_on_ui_queue("append_text", f"Service de recherche indisponible sur le port {port} ({e}), recherche locale.", None)
+            self._dossiersDb_recherche_worker(*worker_args, **worker_kwargs)
+            return
+        if worker_kwargs.get("checkpoint_enabled"):
+            self._put_on_ui_queue("append_text", "Reprise sur incident non disponible via le service : aucun journal tenu.", None)
+        exporter = None
+        if export_path and output_mode != "count":
+            try:
+                exporter = HitExporter(export_path)
+                self._put_on_ui_queue("append_text", f"Export des hits vers {os.path.basename(export_path)}", None)
+            except Exception as e:
+                self._put_on_ui_queue("append_text", f"[ERREUR] Export impossible ({export_path}): {str(e)}", "error_item")
+        request = {"roots": dossiers, "term": terme, "extensions": extensions, "filter_duplicates": filtrer_doublons,
+                   "excluded": exclusions, "case_sensitive": sensible_casse, "options": options,
+                   "token": search_service_token(), "raw_hits": exporter is not None}
+        try:
+            with conn, conn.makefile('rb') as stream:
+                conn.settimeout(None) # Une recherche peut rester longtemps sans message (gros fichiers)
+                conn.sendall((json.dumps(request, ensure_ascii=False) + "\n").encode('utf-8'))
+                for line in stream:
+                    try:
+                        message = json.loads(line)
+                    except ValueError:
+                        continue
+                    if message[0] == "hit": # Hits bruts (export demandé) : affichés et exportés ici
+                        _, res_nom_fichier, res_index, res_ligne_content, res_offset, copies = message
+                        self._afficher_hit(output_mode, res_nom_fichier, res_index, res_ligne_content, res_offset, copies)
+                        for chemin in (res_nom_fichier, *copies):
+                            exporter.write_hit(chemin, res_index, res_ligne_content)
+                    elif message[0] != "query_done":
+                        self._put_on_ui_queue(*message)
+        except OSError as e:
+            self._put_on_ui_queue("append_text", f"[ERREUR] Connexion au service de recherche perdue: {str(e)}", "error_item")
+            self._put_on_ui_queue("status_label", "Recherche interrompue.")
+        finally:
+            if exporter:
+                try:
+                    exporter.close()
+                    self._put_on_ui_queue("append_text", f"{exporter.hits_written} hits exportés vers {os.path.basename(export_path)}", None)
+                except Exception as e:
+                    self._put_on_ui_queue("append_text", f"[ERREUR] Finalisation de l'export: {str(e)}", "error_item")
+
+    def _recherche_distribuee(self, noeuds, worker_args, worker_kwargs):
+        """Coordinateur : chaque nœud (service --serve) parcourt une partition des dossiers et renvoie ses hits bruts ;
+        doublons, statistiques, limite totale et export sont fusionnés ici. La partition d'un nœud défaillant
+        est confiée au nœud suivant encore joignable, les hits déjà reçus n'étant pas réaffichés."""
+        dossiers, terme, extensions, filtrer_doublons, _, exclusions, sensible_casse = worker_args
+        output_mode = worker_kwargs.get("output_mode", "lines")
+        max_hits_total = worker_kwargs.get("max_hits_total", 0)
+        export_path = worker_kwargs.get("export_path")
+        # L'export est fait par le coordinateur ; pas de point de reprise en mode distribué
+        options = {key: value for key, value in worker_kwargs.items() if key not in ("export_path", "checkpoint_enabled")}
+        jeton = search_service_token() # Le même jeton doit figurer dans le config.json de chaque nœud
+        nb_partitions = len(noeuds)
+        lock = threading.Lock()
+        stop_event = threading.Event()
+        noeuds_hors_service = set()
+        lignes_vues = set()
+        progression = [(0, 0)] * nb_partitions
+        totaux = {"hits": 0, "errors": 0, "duplicates": 0, "partitions": 0}
+
+        exporter = None
+        if export_path and output_mode != "count":
+            try:
+                exporter = HitExporter(export_path)
+                self._put_on_ui_queue("append_text", f"Export des hits vers {os.path.basename(export_path)}", None)
+            except Exception as e:
+                totaux["errors"] += 1
+                self._put_on_ui_queue("append_text", f"[ERREUR] Export impossible ({export_path}): {str(e)}", "error_item")
+
+        def recevoir_hit(deja_recus, res_nom_fichier, res_index, res_ligne_content, res_offset, copies=()):
+            if (res_nom_fichier, res_index, res_offset) in deja_recus:
+                return # Partition réattribuée : ce hit a déjà été traité lors de la tentative précédente
+            deja_recus.add((res_nom_fichier, res_index, res_offset))
+            with lock:
+                if max_hits_total and totaux["hits"] >= max_hits_total:
+                    stop_event.set()
+                    return
+                if filtrer_doublons and output_mode == "lines":
+                    if res_ligne_content in lignes_vues:
+                        totaux["duplicates"] += 1
+                        self._put_on_ui_queue("duplicates_info", f"Doublons évités: {totaux['duplicates']}")
+                        return
+                    lignes_vues.add(res_ligne_content)
+                totaux["hits"] += 1
+                self._afficher_hit(output_mode, res_nom_fichier, res_index, res_ligne_content, res_offset, copies)
+                if exporter:
+                    for chemin in (res_nom_fichier, *copies):
+                        exporter.write_hit(chemin, res_index, res_ligne_content)
+
+        def interroger_noeud(index, hote, port, deja_recus):
+            """Traite la partition index sur un nœud. Renvoie None si elle est terminée, sinon la raison de l'échec."""
+            request = {"roots": dossiers, "term": terme, "extensions": extensions, "filter_duplicates": False,
+                       "excluded": exclusions, "case_sensitive": sensible_casse, "options": dict(options, shard=[index, nb_partitions]),
+                       "token": jeton}
+            statistiques_noeud = None
+            try:
+                with socket.create_connection((hote, port), timeout=DAEMON_CONNECT_TIMEOUT) as conn, conn.makefile('rb') as stream:
+                    conn.settimeout(None)
+                    conn.sendall((json.dumps(request, ensure_ascii=False) + "\n").encode('utf-8'))
+                    for line in stream:
+                        if stop_event.is_set():
+                            return None # Limite totale atteinte : fermer la connexion annule la requête sur le nœud
+                        try:
+                            message = json.loads(line)
+                        except ValueError:
+                            continue
+                        msg_type = message[0]
+                        if msg_type == "hit":
+                            recevoir_hit(deja_recus, *message[1:])
+                        elif msg_type == "query_done":
+                            if statistiques_noeud:
+                                with lock:
+                                    totaux["errors"] += statistiques_noeud[1]
+                                    if output_mode == "count":
+                                        totaux["hits"] += statistiques_noeud[0]
+                            return None
+                        elif msg_type == "search_stats_update":
+                            statistiques_noeud = message[1:]
+                        elif msg_type == "progress_update":
+                            with lock:
+                                progression[index] = (message[1], message[2])
+                                self._put_on_ui_queue("progress_update", sum(p[0] for p in progression), sum(p[1] for p in progression))
+                        elif msg_type == "append_text":
+                            if message[2] == "new_item": # Mode comptage : une ligne par fichier
+                                if message[1] not in deja_recus:
+                                    deja_recus.add(message[1])
+                                    self._put_on_ui_queue(*message)
+                            else:
+                                self._put_on_ui_queue("append_text", f"[{hote}:{port}] {message[1]}", *message[2:])
+                        elif msg_type not in ("status_label", "duplicates_info"):
+                            self._put_on_ui_queue(*message)
+                return "connexion fermée avant la fin de la recherche"
+            except OSError as e:
+                return str(e)
+
+        def traiter_partition(index):
+            deja_recus = set()
+            for decalage in range(nb_partitions):
+                hote, port = noeuds[(index + decalage) % nb_partitions]
+                with lock:
+                    if (hote, port) in noeuds_hors_service:
+                        continue
+                echec = interroger_noeud(index, hote, port, deja_recus)
+                if echec is None:
+                    with lock:
+                        totaux["partitions"] += 1
+                        self._put_on_ui_queue("status_label", f"Recherche distribuée: {totaux['partitions']}/{nb_partitions} partitions terminées")
+                    return
+                with lock:
+                    noeuds_hors_service.add((hote, port))
+                self._put_on_ui_queue("append_text", f"[ERREUR] Nœud {hote}:{port} hors service ({echec}), "
+                                                     f"partition {index + 1}/{nb_partitions} réattribuée.", "error_item")
+            with lock:
+                totaux["errors"] += 1
+            self._put_on_ui_queue("append_text", f"[ERREUR] Partition {index + 1}/{nb_partitions} non traitée : aucun nœud disponible.", "error_item")
+
+        self._put_on_ui_queue("append_text", f"Recherche distribuée sur {nb_partitions} nœud(s).", None)
+        threads = [threading.Thread(target=traiter_partition, args=(index,), daemon=True) for index in range(nb_partitions)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if exporter:
+            try:
+                exporter.close()
+                self._put_on_ui_queue("append_text", f"{exporter.hits_written} hits exportés vers {os.path.basename(export_path)}", None)
+            except Exception as e:
+                totaux["errors"] += 1
+                self._put_on_ui_queue("append_text", f"[ERREUR] Finalisation de l'export: {str(e)}", "error_item")
+        if stop_event.is_set():
+            self._put_on_ui_queue("append_text", f"Limite de {max_hits_total} hits atteinte, recherche arrêtée.", None)
+        if not totaux["hits"]:
+            self._put_on_ui_queue("append_text", "Aucun résultat trouvé.", None)
+        self._put_on_ui_queue("search_stats_update", totaux["hits"], totaux["errors"], totaux["duplicates"])
+        self._put_on_ui_queue("status_label", "Recherche terminée.")
+        if filtrer_doublons and totaux["duplicates"]:
+            self._put_on_ui_queue("duplicates_info", f"Doublons évités: {totaux['duplicates']}")
+
+    def _afficher_hit(self, output_mode, res_nom_fichier, res_index, res_ligne_content, res_offset, copies=()):
+        # L'emplacement accompagne le message : un double-clic sur le hit affiche son contexte
+        location = (res_nom_fichier, res_index, res_offset)
+        if output_mode == "files":
+            self._put_on_ui_queue("append_text", f"[NEW] {res_nom_fichier} (L{res_index}){self._format_copies(copies)}", "new_item", location)
+        else:
+            self._put_on_ui_queue("append_text", f"[NEW] {os.path.basename(res_nom_fichier)}, L{res_index}: {res_ligne_content}"
+                                                 f"{self._format_copies(copies, output_mode)}", "new_item", location)
+
+    @staticmethod
+    def _format_copies(copies, output_mode="files"):
+        """Suffixe listant les fichiers identiques au fichier parcouru (chemins complets sauf en mode lignes)."""
+        if not copies:
+            return ""
+        noms = [os.path.basename(c) for c in copies] if output_mode == "lines" else list(copies)
+        return f" (identique : {', '.join(noms)})"
+
+    def _get_search_service_port(self):
+        try:
+            port = self.search_service_port_var.get()
+            if 0 < port < 65536:
+                return port
+        except tk.TclError:
+            pass
+        self.search_service_port_var.set(DEFAULT_DAEMON_PORT)
+        return DEFAULT_DAEMON_PORT
+
     @staticmethod
     def recherche_DB(nom_fichier, batabase_term): # Renommé batabase en batabase_term pour éviter confusion
         # Cette méthode est maintenant appelée par _recherche_DB_process_wrapper
@@ -983,54 +3517,189 @@ class RechercheDBAppTk:
         pass # La logique est maintenant dans _recherche_DB_internal
 
     @staticmethod
-    def _recherche_DB_internal(nom_fichier, batabase_term, case_sensitive):
-        resultats_fichier = []
+    def _recherche_DB_internal(nom_fichier, batabase_term, case_sensitive, output_mode="lines", max_hits_per_file=0, accent_insensitive=False,
+                               fuzzy_distance=0):
+        # output_mode : "lines" (toutes les lignes), "files" (arrêt au premier hit), "count" (renvoie un entier)
+        # accent_insensitive : casse et accents ignorés (é = E), par tables de repli sur des blocs d'octets
+        # fuzzy_distance : recherche approchée (0 = désactivée), nombre maximal d'éditions tolérées
         erreurs_fichier = []
         encodings_to_try = ['utf-8', 'latin-1', 'cp1252']
+        count_only = output_mode == "count"
+        hits_limit = 1 if output_mode == "files" else max_hits_per_file
 
-        search_term_to_use = batabase_term if case_sensitive else batabase_term.lower()
+        reader = source_reader_for(nom_fichier)
+        if reader:
+            try:
+                found = reader(nom_fichier, batabase_term, case_sensitive, accent_insensitive, fuzzy_distance, hits_limit, count_only, erreurs_fichier)
+                return (found if count_only else [(nom_fichier, index, ligne, offset) for index, ligne, offset in found]), erreurs_fichier
+            except Exception as e:
+                erreurs_fichier.append(f"Erreur lecture {os.path.basename(nom_fichier)}: {str(e)}")
+                return (0 if count_only else []), erreurs_fichier
+
+        matcher = _get_fuzzy_matcher(batabase_term, fuzzy_distance, case_sensitive, accent_insensitive) if fuzzy_distance else None
+        if accent_insensitive and not matcher and not nom_fichier.endswith('.csv'):
+            try:
+                try:
+                    found = scan_folded_file(nom_fichier, batabase_term, hits_limit, count_only)
+                except LongLineError:
+                    try:
+                        found = scan_windowed_file(nom_fichier, batabase_term, case_sensitive, 'utf-8', hits_limit, count_only, True)
+                    except UnicodeDecodeError:
+                        found = scan_windowed_file(nom_fichier, batabase_term, case_sensitive, 'cp1252', hits_limit, count_only, True)
+                return (found if count_only else [(nom_fichier, index, ligne, offset) for index, ligne, offset in found]), erreurs_fichier
+            except Exception as e:
+                erreurs_fichier.append(f"Erreur lecture {os.path.basename(nom_fichier)}: {str(e)}")
+                return (0 if count_only else []), erreurs_fichier
+
+        if accent_insensitive:
+            search_term_to_use = fold_text(batabase_term)
+        else:
+            search_term_to_use = batabase_term if case_sensitive else batabase_term.lower()
+        if matcher:
+            match_lines, clip_normalize = matcher.iter_matching_lines, matcher.normalize
+        else:
+            match_lines = lambda texte: iter_exact_matching_lines(texte, search_term_to_use, case_sensitive)
+            clip_normalize = (lambda texte: texte) if case_sensitive else str.lower
 
         for encoding in encodings_to_try:
+            resultats_fichier = [] # Repartir de zéro si un encodage précédent a échoué en cours de lecture
+            hits_count = 0
             try:
                 if nom_fichier.endswith('.csv'):
                     with open(nom_fichier, 'r', encoding=encoding) as fichier:
-                        lecteur = csv.reader(fichier)
+                        lecteur = csv.reader(iter_bounded_lines(fichier))
                         for index, ligne_champs in enumerate(lecteur, start=1):
-                            champs_to_check = ligne_champs if case_sensitive else [c.lower() for c in ligne_champs]
-                            if any(search_term_to_use in champ for champ in champs_to_check):
-                                resultats_fichier.append((nom_fichier, index, ' | '.join(ligne_champs)))
+                            if matcher:
+                                trouve = any(matcher.matches(champ) for champ in ligne_champs)
+                            else:
+                                if accent_insensitive:
+                                    champs_to_check = [fold_text(c) for c in ligne_champs]
+                                else:
+                                    champs_to_check = ligne_champs if case_sensitive else [c.lower() for c in ligne_champs]
+                                trouve = any(search_term_to_use in champ for champ in champs_to_check)
+                            if trouve:
+                                hits_count += 1
+                                if not count_only:
+                                    resultats_fichier.append((nom_fichier, index, clip_hit_line(' | '.join(ligne_champs)), None))
+                                if hits_limit and hits_count >= hits_limit:
+                                    break
                 else:
+                    # Par blocs de lignes complètes : un seul parcours du bloc (str.find ou filtre par morceaux)
                     with open(nom_fichier, 'r', encoding=encoding) as fichier:
-                        for index, ligne_texte in enumerate(fichier, start=1):
-                            ligne_to_check = ligne_texte if case_sensitive else ligne_texte.lower()
-                            if search_term_to_use in ligne_to_check:
-                                resultats_fichier.append((nom_fichier, index, ligne_texte.strip()))
+                        line_base, carry = 0, ''
+                        while not (hits_limit and hits_count >= hits_limit):
+                            chunk = fichier.read(FOLD_SCAN_BLOCK_SIZE)
+                            texte = carry + chunk
+                            if not texte:
+                                break
+                            last = len(chunk) < FOLD_SCAN_BLOCK_SIZE # Lecture incomplète : fin de fichier
+                            cut = len(texte) if last else texte.rfind('\n') + 1
+                            if not cut:
+                                raise LongLineError(f"ligne de plus de {FOLD_SCAN_BLOCK_SIZE} caractères")
+                            texte, carry = texte[:cut], texte[cut:]
+                            for index, ligne_texte in match_lines(texte):
+                                hits_count += 1
+                                if not count_only: # Offset retrouvé via l'index des lignes
+                                    resultats_fichier.append((nom_fichier, line_base + index + 1,
+                                                              clip_hit_line(ligne_texte.strip(), search_term_to_use, clip_normalize), None))
+                                if hits_limit and hits_count >= hits_limit:
+                                    break
+                            line_base += texte.count('\n')
+                            if last:
+                                break
                 break # Si la lecture réussit avec cet encodage, on sort de la boucle d'encodage
+            except (LongLineError, csv.Error) as e:
+                if isinstance(e, csv.Error) and 'field limit' not in str(e):
+                    erreurs_fichier.append(f"Erreur lecture {os.path.basename(nom_fichier)} ({encoding}): {str(e)}")
+                    break
+                # Ligne (ou champ CSV) démesurée : relecture par fenêtres, en mémoire bornée
+                try:
+                    found = scan_windowed_file(nom_fichier, batabase_term, case_sensitive, encoding, hits_limit, count_only,
+                                               accent_insensitive, matcher)
+                except UnicodeDecodeError:
+                    if encoding == encodings_to_try[-1]:
+                        erreurs_fichier.append(f"Erreur de décodage pour {os.path.basename(nom_fichier)} après toutes les tentatives.")
+                    continue
+                except Exception as e:
+                    erreurs_fichier.append(f"Erreur lecture {os.path.basename(nom_fichier)} ({encoding}): {str(e)}")
+                    break
+                hits_count = found if count_only else len(found)
+                resultats_fichier = [] if count_only else [(nom_fichier, index, ligne, offset) for index, ligne, offset in found]
+                break
             except UnicodeDecodeError:
                 if encoding == encodings_to_try[-1]: # Si c'est la dernière tentative
                     erreurs_fichier.append(f"Erreur de décodage pour {os.path.basename(nom_fichier)} après toutes les tentatives.")
             except Exception as e:
                 erreurs_fichier.append(f"Erreur lecture {os.path.basename(nom_fichier)} ({encoding}): {str(e)}")
                 break # Erreur autre que décodage, on arrête pour ce fichier
-        return resultats_fichier, erreurs_fichier
+        return (hits_count if count_only else resultats_fichier), erreurs_fichier
 
     @staticmethod
     def _recherche_DB_process_wrapper(args):
-        nom_fichier, batabase_term, case_sensitive = args
-        return RechercheDBAppTk._recherche_DB_internal(nom_fichier, batabase_term, case_sensitive)
+        nom_fichier, batabase_term, case_sensitive, output_mode, max_hits_per_file, accent_insensitive, fuzzy_distance = args
+        found, erreurs = RechercheDBAppTk._recherche_DB_internal(nom_fichier, batabase_term, case_sensitive, output_mode,
+                                                                 max_hits_per_file, accent_insensitive, fuzzy_distance)
+        return (found if isinstance(found, int) else HitBatch.pack(found)), erreurs # Un seul bytes à renvoyer au parent
 
-    def _dossiersDb_recherche_worker(self, dossier_parent, batabase_term, extensions_list_to_use, filter_duplicates, num_workers, excluded_paths_list_to_use, case_sensitive):
-        """Logique de recherche exécutée dans un thread séparé, utilisant ProcessPoolExecutor."""
-        resultats = []
-        fichiers_a_traiter = []
-        # num_workers est maintenant passé en argument
-        # excluded_paths_list_to_use contient déjà des chaînes en minuscules.
-        local_hits_count = 0
-        local_errors_count = 0
-        found_lines_content = set() 
-        duplicates_count = 0
+    @staticmethod
+    def _recherche_champ_exact_internal(nom_fichier, valeur, column, case_sensitive):
+        """Recherche exacte par champ via l'index trié (construit ou reconstruit s'il est absent/périmé)."""
+        resultats_fichier = []
+        erreurs_fichier = []
+        try:
+            index_path, meta_path = _field_index_paths(nom_fichier, column, case_sensitive)
+            if not (os.path.exists(index_path) and _field_index_is_fresh(nom_fichier, meta_path)):
+                build_field_index(nom_fichier, column, case_sensitive)
+            matches = lookup_field_index(index_path, valeur, case_sensitive)
+            if matches:
+                is_csv = nom_fichier.lower().endswith('.csv')
+                with open(nom_fichier, 'rb') as source:
+                    for offset, length, numero in matches:
+                        resultats_fichier.append((nom_fichier, numero, _read_indexed_record(source, offset, length, is_csv), offset))
+        except Exception as e:
+            erreurs_fichier.append(f"Erreur index {os.path.basename(nom_fichier)} (colonne {column}): {str(e)}")
+        return resultats_fichier, erreurs_fichier
+
+    @staticmethod
+    def _recherche_champ_exact_process_wrapper(args):
+        nom_fichier, valeur, column, case_sensitive = args
+        found, erreurs = RechercheDBAppTk._recherche_champ_exact_internal(nom_fichier, valeur, column, case_sensitive)
+        return HitBatch.pack(found), erreurs
+
+    @staticmethod
+    def _claim_file(chemin_fichier, fichiers_vus):
+        """Retourne True la première fois qu'un fichier physique est rencontré (toutes racines confondues)."""
+        real = os.path.normcase(os.path.realpath(chemin_fichier))
+        if real in fichiers_vus:
+            return False
+        fichiers_vus.add(real)
+        return True
 
-        for dossier_racine, dirs, fichiers_in_dir in os.walk(dossier_parent):
+    @staticmethod
+    def _racines_distinctes(dossiers_parents):
+        """[(dossier, chemin réel)] : un dossier imbriqué dans une autre racine n'est parcouru qu'une fois."""
+        racines = []
+        for dossier in dossiers_parents:
+            real = os.path.normcase(os.path.realpath(dossier))
+            if real not in [r for _, r in racines]:
+                racines.append((dossier, real))
+        return [(d, r) for d, r in racines if not any(r != other and r.startswith(other.rstrip(os.sep) + os.sep) for _, other in racines)]
+
+    def _lister_fichiers(self, dossiers_parents, extensions_list_to_use, excluded_paths_list_to_use, file_type_cache=None,
+                         exact_field_column=None, shard=None):
+        """Fichiers à parcourir sous les racines : exclusions, puis extensions (ou détection par le contenu si file_type_cache).
+        Retourne (fichiers, nombre de fichiers binaires ignorés)."""
+        fichiers_a_traiter = []
+        binary_skipped_count = 0
+        racines = self._racines_distinctes(dossiers_parents)
+        fichiers_vus = set() # Un même fichier (liens, racines qui se recouvrent) n'est retenu qu'une fois
+        dossiers_racines = {dossier for dossier, _ in racines}
+
+        for dossier_racine, dirs, fichiers_in_dir in (entry for dossier, _ in racines for entry in os.walk(dossier)):
+            if shard and dossier_racine in dossiers_racines:
+                # Partition par entrée de premier niveau : un nœud ne descend que dans les sous-dossiers qui lui reviennent
+                dirs[:] = [d_name for d_name in dirs if shard_index(d_name, shard[1]) == shard[0]]
+                fichiers_in_dir = [nom for nom in fichiers_in_dir if shard_index(nom, shard[1]) == shard[0]]
             # Prune directories
             original_dirs = list(dirs)
             dirs[:] = [] # Modify in-place
@@ -1054,9 +3723,68 @@ class RechercheDBAppTk:
                 if is_excluded:
                     continue
 
-                if any(nom_fichier_lower.endswith(ext.lower()) for ext in extensions_list_to_use):
+                if exact_field_column and not nom_fichier_lower.endswith(INDEXABLE_EXTENSIONS):
+                    continue # Le mode champ exact ne sait indexer que les CSV et les dumps SQL
+                if file_type_cache:
                     chemin_fichier = os.path.join(dossier_racine, nom_fichier)
-                    fichiers_a_traiter.append(chemin_fichier)
+                    try:
+                        # Les bases SQLite sont binaires mais ont leur lecteur dédié
+                        is_text = nom_fichier_lower.endswith(SOURCE_READER_EXTENSIONS) or file_type_cache.is_text(chemin_fichier)
+                    except OSError:
+                        continue # Fichier illisible (droits, lien cassé...)
+                    if not is_text:
+                        binary_skipped_count += 1
+                    elif self._claim_file(chemin_fichier, fichiers_vus):
+                        fichiers_a_traiter.append(chemin_fichier)
+                elif any(nom_fichier_lower.endswith(ext.lower()) for ext in extensions_list_to_use):
+                    chemin_fichier = os.path.join(dossier_racine, nom_fichier)
+                    if self._claim_file(chemin_fichier, fichiers_vus):
+                        fichiers_a_traiter.append(chemin_fichier)
+        return fichiers_a_traiter, binary_skipped_count
+
+    def _dossiersDb_recherche_worker(self, dossiers_parents, batabase_term, extensions_list_to_use, filter_duplicates, num_workers, excluded_paths_list_to_use, case_sensitive, content_sniffing=False, auto_tune_workers=False, exact_field_column=None, read_ahead_depth=0, export_path=None,
+                                    output_mode="lines", max_hits_total=0, max_hits_per_file=0, checkpoint_enabled=False,
+                                    accent_insensitive=False, fuzzy_distance=0, executor=None, fair_share=None, cancel_event=None,
+                                    file_type_cache=None, shard=None, skip_identical_files=False, content_manifest=None):
+        """Logique de recherche exécutée dans un thread séparé, utilisant ProcessPoolExecutor.
+        Le service de recherche local fournit son pool déjà démarré (executor), la part de workers de la requête
+        (fair_share), un événement d'annulation, son cache de types de fichiers et son manifeste de contenu.
+        shard : (index, nombre) en recherche distribuée, seule la partition index de chaque racine est parcourue.
+        skip_identical_files : un contenu présent sous plusieurs noms n'est parcouru qu'une fois, ses hits citent toutes les copies."""
+        any_result_found = False # Les hits ne sont pas conservés : affichés puis éventuellement exportés
+        # num_workers est maintenant passé en argument
+        # excluded_paths_list_to_use contient déjà des chaînes en minuscules.
+        local_hits_count = 0
+        local_errors_count = 0
+        found_lines_content = set() 
+        duplicates_count = 0
+        if content_sniffing and file_type_cache is None:
+            file_type_cache = FileTypeCache()
+        elif not content_sniffing:
+            file_type_cache = None
+
+        fichiers_a_traiter, binary_skipped_count = self._lister_fichiers(dossiers_parents, extensions_list_to_use, excluded_paths_list_to_use,
+                                                                         file_type_cache, exact_field_column, shard)
+
+        if file_type_cache:
+            try:
+                file_type_cache.save()
+            except OSError as e:
+                print(f"Erreur lors de la sauvegarde du cache de types de fichiers: {e}")
+            if binary_skipped_count:
+                self._put_on_ui_queue("append_text", f"{binary_skipped_count} fichier(s) binaire(s) ignoré(s).", None)
+
+        copies_identiques = {}
+        if skip_identical_files and len(fichiers_a_traiter) > 1:
+            manifest = content_manifest if content_manifest is not None else ContentManifest()
+            fichiers_a_traiter, copies_identiques = manifest.group_identical(fichiers_a_traiter)
+            try:
+                manifest.save()
+            except OSError as e:
+                print(f"Erreur lors de la sauvegarde du manifeste de contenu: {e}")
+            nb_copies = sum(len(copies) for copies in copies_identiques.values())
+            if nb_copies:
+                self._put_on_ui_queue("append_text", f"{nb_copies} fichier(s) identique(s) à un autre ignoré(s), contenu parcouru une seule fois.", None)
         
         if not fichiers_a_traiter:
             self._put_on_ui_queue("append_text", "Aucun fichier pertinent trouvé.", None)
@@ -1069,45 +3797,228 @@ class RechercheDBAppTk:
         self._put_on_ui_queue("progress_update", 0, total_files)
         self._put_on_ui_queue("duplicates_info", "") # Réinitialiser au début
         processed_files_count = 0
-        
-        with ProcessPoolExecutor(max_workers=num_workers) as executor:
-            # Préparer les arguments pour le wrapper
-            tasks_args = [(fichier, batabase_term, case_sensitive) for fichier in fichiers_a_traiter]
-            futures = {executor.submit(RechercheDBAppTk._recherche_DB_process_wrapper, task_arg): task_arg[0] for task_arg in tasks_args}
-            for future in as_completed(futures):
-                processed_files_count += 1
-                fichier = futures[future]
-                
-                self._put_on_ui_queue("progress_update", processed_files_count, total_files)
-                self._put_on_ui_queue("status_label", f"Traitement: {os.path.basename(fichier)} ({processed_files_count}/{total_files})")
 
-                try:
-                    file_matches, file_errors = future.result()
-                    for res_nom_fichier, res_index, res_ligne_content in file_matches:
-                        if filter_duplicates:
-                            if res_ligne_content not in found_lines_content:
-                                found_lines_content.add(res_ligne_content)
-                                local_hits_count +=1
-                                self._put_on_ui_queue("append_text", f"[NEW] {os.path.basename(res_nom_fichier)}, L{res_index}: {res_ligne_content}", "new_item")
+        def afficher_hit(res_nom_fichier, res_index, res_ligne_content, res_offset):
+            self._afficher_hit(output_mode, res_nom_fichier, res_index, res_ligne_content, res_offset,
+                               copies_identiques.get(res_nom_fichier, ()))
+
+        def exporter_hit(res_nom_fichier, res_index, res_ligne_content):
+            # Une ligne d'export par chemin : les copies identiques contiennent le même hit
+            for chemin in (res_nom_fichier, *copies_identiques.get(res_nom_fichier, ())):
+                exporter.write_hit(chemin, res_index, res_ligne_content)
+
+        checkpoint = None
+        if checkpoint_enabled:
+            query = {"roots": sorted(r for _, r in self._racines_distinctes(dossiers_parents)), "term": batabase_term, "case_sensitive": case_sensitive,
+                     "extensions": sorted(extensions_list_to_use), "excluded": sorted(excluded_paths_list_to_use),
+                     "content_sniffing": content_sniffing, "exact_field_column": exact_field_column, "output_mode": output_mode,
+                     "max_hits_total": max_hits_total, "max_hits_per_file": max_hits_per_file, "filter_duplicates": filter_duplicates,
+                     "accent_insensitive": accent_insensitive, "fuzzy_distance": fuzzy_distance,
+                     "skip_identical_files": skip_identical_files}
+            try:
+                checkpoint = SearchCheckpoint(query)
+            except OSError as e:
+                self._put_on_ui_queue("append_text", f"[ERREUR] Point de reprise indisponible: {str(e)}", "error_item")
+        if checkpoint and checkpoint.resumed:
+            # Réafficher une seule fois les résultats des fichiers déjà terminés, puis ne traiter que le reste
+            fichiers_restants = []
+            for fichier in fichiers_a_traiter:
+                record = checkpoint.done_record(fichier)
+                if record is None:
+                    fichiers_restants.append(fichier)
+                    continue
+                processed_files_count += 1
+                local_hits_count += record["count"]
+                duplicates_count += record["duplicates"]
+                local_errors_count += record["errors"]
+                if output_mode == "count":
+                    if record["count"]:
+                        self._put_on_ui_queue("append_text", f"[NEW] {fichier}: {record['count']} hit(s)"
+                                                             f"{self._format_copies(copies_identiques.get(fichier, ()))}", "new_item")
+                for res_index, res_ligne_content, res_offset in record["hits"]:
+                    found_lines_content.add(res_ligne_content)
+                    afficher_hit(fichier, res_index, res_ligne_content, res_offset)
+                if record["count"]:
+                    any_result_found = True
+            self._put_on_ui_queue("append_text", f"Reprise de la recherche : {processed_files_count} fichier(s) déjà traité(s), "
+                                                 f"{len(checkpoint.partial_files)} fichier(s) entamé(s).", None)
+            self._put_on_ui_queue("progress_update", processed_files_count, total_files)
+            fichiers_a_traiter = fichiers_restants
+
+        exporter = None
+        if export_path and output_mode == "count":
+            self._put_on_ui_queue("append_text", "Export ignoré en mode comptage (aucune ligne à exporter).", None)
+        elif export_path:
+            try:
+                # En reprise, les hits déjà exportés restent dans le fichier : on le complète
+                exporter = HitExporter(export_path, append=bool(checkpoint and checkpoint.resumed))
+                self._put_on_ui_queue("append_text", f"Export des hits vers {os.path.basename(export_path)}", None)
+            except Exception as e:
+                local_errors_count += 1
+                self._put_on_ui_queue("append_text", f"[ERREUR] Export impossible ({export_path}): {str(e)}", "error_item")
+        
+        scheduler = DeviceScheduler(fichiers_a_traiter)
+        if auto_tune_workers:
+            # Pool dimensionné au maximum ; c'est le nombre de fichiers en vol qui s'ajuste au débit mesuré
+            pool_size = max(num_workers, os.cpu_count() or 1)
+            tuner = WorkerAutoTuner(initial=num_workers, minimum=1, maximum=pool_size)
+        else:
+            pool_size = num_workers
+            tuner = None
+        self._put_on_ui_queue("append_text", f"Supports: {scheduler.describe()}", None)
+
+        search_completed = False
+        shared_executor = executor is not None
+        with (contextlib.nullcontext(executor) if shared_executor else ProcessPoolExecutor(max_workers=pool_size)) as executor:
+            pipeline = None
+            if read_ahead_depth and not exact_field_column:
+                pipeline = ReadAheadPipeline(executor, batabase_term, case_sensitive, prefetch_depth=read_ahead_depth,
+                                             output_mode=output_mode, max_hits_per_file=max_hits_per_file, accent_insensitive=accent_insensitive,
+                                             fuzzy_distance=fuzzy_distance)
+            try:
+                # Préparer les arguments pour le wrapper
+                if exact_field_column:
+                    tasks_args = [(fichier, batabase_term, exact_field_column, case_sensitive) for fichier in fichiers_a_traiter]
+                    process_wrapper = RechercheDBAppTk._recherche_champ_exact_process_wrapper
+                else:
+                    tasks_args = [(fichier, batabase_term, case_sensitive, output_mode, max_hits_per_file, accent_insensitive, fuzzy_distance)
+                                  for fichier in fichiers_a_traiter]
+                    process_wrapper = RechercheDBAppTk._recherche_DB_process_wrapper
+                tasks_by_file = {task_arg[0]: task_arg for task_arg in tasks_args}
+                futures = {}
+
+                def submit_ready_files():
+                    in_flight_limit = tuner.window if tuner else pool_size
+                    if fair_share:
+                        in_flight_limit = min(in_flight_limit, fair_share()) # Pool partagé entre requêtes concurrentes
+                    for fichier_pret in scheduler.take(in_flight_limit - len(futures)):
+                        if pipeline and not fichier_pret.lower().endswith(('.csv',) + SOURCE_READER_EXTENSIONS):
+                            # Les CSV gardent le parseur par enregistrement, SQLite et NDJSON leur lecteur dédié
+                            if checkpoint:
+                                futures[pipeline.submit_file(fichier_pret, resume=checkpoint.resume_point(fichier_pret),
+                                                             on_progress=checkpoint.record_chunk)] = fichier_pret
                             else:
-                                duplicates_count += 1
-                                self._put_on_ui_queue("duplicates_info", f"Doublons évités: {duplicates_count}")
-                        else: # Ne pas filtrer les doublons
-                            local_hits_count +=1
-                            self._put_on_ui_queue("append_text", f"[NEW] {os.path.basename(res_nom_fichier)}, L{res_index}: {res_ligne_content}", "new_item")
-
-                    for error_msg in file_errors:
-                        local_errors_count +=1
-                        self._put_on_ui_queue("append_text", f"[ERREUR] {error_msg}", "error_item")
+                                futures[pipeline.submit_file(fichier_pret)] = fichier_pret
+                        else:
+                            futures[executor.submit(process_wrapper, tasks_by_file[fichier_pret])] = fichier_pret
+
+                def cancel_pending():
+                    if pipeline:
+                        pipeline.cancel()
+                    if shared_executor:
+                        for pending in futures: # Ne pas arrêter le pool : il sert aussi aux autres requêtes
+                            pending.cancel()
+                    else:
+                        executor.shutdown(wait=False, cancel_futures=True)
+
+                submit_ready_files()
+                stop_search = False
+                while futures and not stop_search:
+                    done, _ = wait(futures, timeout=0.5 if cancel_event else None, return_when=FIRST_COMPLETED)
+                    if cancel_event and cancel_event.is_set():
+                        cancel_pending()
+                        self._put_on_ui_queue("append_text", "Recherche annulée.", None)
+                        break
+                    for future in done:
+                        processed_files_count += 1
+                        fichier = futures.pop(future)
+                        file_size = scheduler.release(fichier)
+                        if tuner and tuner.record(file_size):
+                            self._put_on_ui_queue("status_label", f"Workers ajustés à {tuner.window}")
                     
-                    if file_matches:
-                        resultats.extend(file_matches)
-                except Exception as e:
-                    local_errors_count +=1 # Compter aussi les erreurs de tâche
-                    self._put_on_ui_queue("append_text", f"[ERREUR TÂCHE] {os.path.basename(fichier)}: {str(e)}", "error_item")
-                    print(f"Erreur lors du traitement du fichier {fichier}: {str(e)}")
+                        self._put_on_ui_queue("progress_update", processed_files_count, total_files)
+                        self._put_on_ui_queue("status_label", f"Traitement: {os.path.basename(fichier)} ({processed_files_count}/{total_files})")
+
+                        hits_before, duplicates_before, errors_before = local_hits_count, duplicates_count, local_errors_count
+                        hits_affiches = []
+                        try:
+                            file_matches, file_errors = future.result()
+                            # Normaliser selon le mode de sortie (la recherche par index renvoie toujours des lignes)
+                            if output_mode == "count":
+                                file_count = file_matches if isinstance(file_matches, int) else len(file_matches)
+                                if max_hits_per_file:
+                                    file_count = min(file_count, max_hits_per_file)
+                                file_matches = []
+                                if file_count:
+                                    any_result_found = True
+                                    local_hits_count += file_count
+                                    self._put_on_ui_queue("append_text", f"[NEW] {fichier}: {file_count} hit(s)"
+                                                                         f"{self._format_copies(copies_identiques.get(fichier, ()))}", "new_item")
+                            elif output_mode == "files":
+                                file_matches = file_matches[:1]
+                            elif max_hits_per_file:
+                                file_matches = file_matches[:max_hits_per_file]
+
+                            if output_mode == "files":
+                                for res_nom_fichier, res_index, res_ligne_content, res_offset in file_matches:
+                                    local_hits_count += 1
+                                    hits_affiches.append((res_nom_fichier, res_index, res_ligne_content, res_offset))
+                                    afficher_hit(res_nom_fichier, res_index, res_ligne_content, res_offset)
+                                    if exporter:
+                                        exporter_hit(res_nom_fichier, res_index, res_ligne_content)
+                                file_matches_to_display = []
+                            else:
+                                file_matches_to_display = file_matches
+                            if max_hits_total and local_hits_count + len(file_matches_to_display) > max_hits_total:
+                                file_matches_to_display = file_matches_to_display[:max(0, max_hits_total - local_hits_count)]
+
+                            for res_nom_fichier, res_index, res_ligne_content, res_offset in file_matches_to_display:
+                                if filter_duplicates:
+                                    if res_ligne_content not in found_lines_content:
+                                        found_lines_content.add(res_ligne_content)
+                                        local_hits_count +=1
+                                        hits_affiches.append((res_nom_fichier, res_index, res_ligne_content, res_offset))
+                                        afficher_hit(res_nom_fichier, res_index, res_ligne_content, res_offset)
+                                        if exporter:
+                                            exporter_hit(res_nom_fichier, res_index, res_ligne_content)
+                                    else:
+                                        duplicates_count += 1
+                                        self._put_on_ui_queue("duplicates_info", f"Doublons évités: {duplicates_count}")
+                                else: # Ne pas filtrer les doublons
+                                    local_hits_count +=1
+                                    hits_affiches.append((res_nom_fichier, res_index, res_ligne_content, res_offset))
+                                    afficher_hit(res_nom_fichier, res_index, res_ligne_content, res_offset)
+                                    if exporter:
+                                        exporter_hit(res_nom_fichier, res_index, res_ligne_content)
+
+                            for error_msg in file_errors:
+                                local_errors_count +=1
+                                self._put_on_ui_queue("append_text", f"[ERREUR] {error_msg}", "error_item")
+                        
+                            if file_matches:
+                                any_result_found = True
+                            if checkpoint:
+                                checkpoint.record_file(fichier, hits_affiches, local_hits_count - hits_before,
+                                                       duplicates_count - duplicates_before, local_errors_count - errors_before)
+                        except Exception as e:
+                            local_errors_count +=1 # Compter aussi les erreurs de tâche
+                            self._put_on_ui_queue("append_text", f"[ERREUR TÂCHE] {os.path.basename(fichier)}: {str(e)}", "error_item")
+                            print(f"Erreur lors du traitement du fichier {fichier}: {str(e)}")
+
+                        if max_hits_total and local_hits_count >= max_hits_total:
+                            # Limite globale atteinte : annuler tout ce qui n'a pas encore démarré
+                            cancel_pending()
+                            self._put_on_ui_queue("append_text", f"Limite de {max_hits_total} hits atteinte, recherche arrêtée.", None)
+                            stop_search = True
+                            break
+                    if not stop_search:
+                        submit_ready_files() # Remplacer les fichiers terminés, périphérique par périphérique
+                search_completed = not (cancel_event and cancel_event.is_set())
+            finally:
+                if pipeline:
+                    pipeline.close()
+                if checkpoint:
+                    # Journal conservé uniquement si la recherche n'est pas allée au bout
+                    checkpoint.close(completed=search_completed)
+                if exporter:
+                    try:
+                        exporter.close()
+                        self._put_on_ui_queue("append_text", f"{exporter.hits_written} hits exportés vers {os.path.basename(export_path)}", None)
+                    except Exception as e:
+                        local_errors_count += 1
+                        self._put_on_ui_queue("append_text", f"[ERREUR] Finalisation de l'export: {str(e)}", "error_item")
         
-        if not resultats and processed_files_count == total_files:
+        if not any_result_found:
              self._put_on_ui_queue("append_text", "Aucun résultat trouvé.", None)
 
         self._put_on_ui_queue("search_stats_update", local_hits_count, local_errors_count, duplicates_count)
@@ -1116,18 +4027,331 @@ class RechercheDBAppTk:
             self._put_on_ui_queue("duplicates_info", f"Doublons évités: {duplicates_count}")
         # else: # Optionnel: effacer si aucun doublon
             # self._put_on_ui_queue("duplicates_info", "") 
+
+    def _lot_requetes_worker(self, nom_lot, requetes, dossiers_parents, extensions_list_to_use, num_workers, excluded_paths_list_to_use,
+                             content_sniffing=False):
+        """Exécute un lot de requêtes enregistré : chaque fichier nouveau ou modifié depuis la dernière exécution est lu
+        une seule fois pour toutes les requêtes. Un export JSONL par requête et un résumé chronométré (summary.json)
+        sont écrits dans dlu_batches/<lot>/<date>/. Retourne le résumé."""
+        debut, date_debut = time.perf_counter(), time.strftime("%Y-%m-%dT%H:%M:%S")
+        self._put_on_ui_queue("status_label", f"Lot '{nom_lot}' : recherche des fichiers...")
+        file_type_cache = FileTypeCache() if content_sniffing else None
+        fichiers, _ = self._lister_fichiers(dossiers_parents, extensions_list_to_use, excluded_paths_list_to_use, file_type_cache)
+        if file_type_cache:
+            try:
+                file_type_cache.save()
+            except OSError as e:
+                print(f"Erreur lors de la sauvegarde du cache de types de fichiers: {e}")
+        etat = QueryBatchState(nom_lot)
+        cles = [query_batch_key(requete) for requete in requetes]
+        travail = etat.pending(fichiers, cles)
+        duree_listage = time.perf_counter() - debut
+        self._put_on_ui_queue("append_text", f"Lot '{nom_lot}' : {len(requetes)} requête(s), {len(travail)} fichier(s) nouveau(x) "
+                                             f"ou modifié(s) sur {len(fichiers)}.", None)
+
+        dossier_execution = base_execution = os.path.join(etat.directory, time.strftime("%Y%m%d-%H%M%S"))
+        numero_execution = 1
+        while os.path.exists(dossier_execution): # Deux exécutions dans la même seconde
+            numero_execution += 1
+            dossier_execution = f"{base_execution}-{numero_execution}"
+        os.makedirs(dossier_execution)
+        stats = [{"term": requete["term"], **{option: requete.get(option) for option in QUERY_BATCH_OPTIONS},
+                  "output": os.path.join(dossier_execution, f"{i + 1:02d}_{_file_slug(requete['term'])}.jsonl"),
+                  "hits": 0, "files_with_hits": 0, "match_seconds": 0.0} for i, requete in enumerate(requetes)]
+        exporters = [HitExporter(stat["output"]) for stat in stats]
+        errors_count = 0
+        debut_scan = time.perf_counter()
+        try:
+            with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                futures = {}
+                for chemin, indices, stat_key in travail:
+                    args = [(requetes[i]["term"], bool(requetes[i].get("case_sensitive")), bool(requetes[i].get("accent_insensitive")),
+                             int(requetes[i].get("fuzzy_distance") or 0), int(requetes[i].get("max_hits_per_file") or 0)) for i in indices]
+                    futures[executor.submit(scan_query_batch, chemin, args)] = (chemin, indices, stat_key)
+                for done_count, future in enumerate(as_completed(futures), start=1):
+                    chemin, indices, stat_key = futures[future]
+                    self._put_on_ui_queue("progress_update", done_count, len(futures))
+                    self._put_on_ui_queue("status_label", f"Lot '{nom_lot}' : {os.path.basename(chemin)} ({done_count}/{len(futures)})")
+                    try:
+                        resultats, erreurs, durees = future.result()
+                    except Exception as e:
+                        resultats, erreurs, durees = [], [f"{os.path.basename(chemin)}: {str(e)}"], []
+                    for i, hits, duree in zip(indices, resultats, durees):
+                        for res_nom_fichier, res_index, res_ligne_content, _ in hits:
+                            exporters[i].write_hit(res_nom_fichier, res_index, res_ligne_content)
+                        stats[i]["hits"] += len(hits)
+                        stats[i]["files_with_hits"] += 1 if hits else 0
+                        stats[i]["match_seconds"] += duree
+                    for error_msg in erreurs:
+                        errors_count += 1
+                        self._put_on_ui_queue("append_text", f"[ERREUR] {error_msg}", "error_item")
+                    if not erreurs: # Un fichier en erreur est repris à la prochaine exécution
+                        etat.mark_done(chemin, stat_key, [cles[i] for i in indices])
+        finally:
+            for exporter in exporters:
+                exporter.close()
+            etat.save()
+
+        summary = {"batch": nom_lot, "started": date_debut,
+                   "files_listed": len(fichiers), "files_scanned": len(travail), "errors": errors_count,
+                   "listing_seconds": round(duree_listage, 3), "scan_seconds": round(time.perf_counter() - debut_scan, 3),
+                   "total_seconds": round(time.perf_counter() - debut, 3),
+                   "queries": [dict(stat, match_seconds=round(stat["match_seconds"], 3)) for stat in stats]}
+        with open(os.path.join(dossier_execution, "summary.json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        for stat in summary["queries"]:
+            self._put_on_ui_queue("append_text", f"[LOT] {stat['term']}: {stat['hits']} hit(s) dans {stat['files_with_hits']} fichier(s), "
+                                                 f"{stat['match_seconds']} s de recherche -> {stat['output']}", "new_item" if stat["hits"] else None)
+        self._put_on_ui_queue("append_text", f"Lot '{nom_lot}' terminé en {summary['total_seconds']} s (listage {summary['listing_seconds']} s, "
+                                             f"lecture {summary['scan_seconds']} s). Résumé : {os.path.join(dossier_execution, 'summary.json')}", None)
+        self._put_on_ui_queue("search_stats_update", sum(stat["hits"] for stat in stats), errors_count, 0)
+        self._put_on_ui_queue("status_label", "Lot terminé.")
+        return summary
     
+# --- Service de recherche local : pool, caches et index restent chauds entre les recherches ---
+DAEMON_HOST = "127.0.0.1" # Uniquement la machine locale
+DEFAULT_DAEMON_PORT = 8765
+DAEMON_CONNECT_TIMEOUT = 2.0
+DAEMON_MAX_PREFETCH_DEPTH = 16 # Par requête : chaque bloc en vol est un segment de READ_AHEAD_BLOCK_SIZE dans /dev/shm
+# Options de _dossiersDb_recherche_worker qu'un client peut transmettre. Aucune n'écrit de fichier à un chemin choisi
+# par le client : l'export est fait par le client à partir des hits reçus, la reprise sur incident reste locale.
+_DAEMON_QUERY_OPTIONS = ("content_sniffing", "auto_tune_workers", "exact_field_column", "read_ahead_depth",
+                         "output_mode", "max_hits_total", "max_hits_per_file", "accent_insensitive",
+                         "fuzzy_distance", "shard", "skip_identical_files")
+# Clés de config.json propres au service, conservées quand l'application réécrit ses paramètres
+SERVICE_CONFIG_KEYS = ("search_service_token", "search_service_roots")
+_CONFIG_LOCK = threading.Lock() # Lecture-modification-écriture de config.json
+
+def _read_config():
+    try:
+        with open(RechercheDBAppTk.CONFIG_FILE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def search_service_token():
+    """Jeton partagé exigé par le service (clé search_service_token de config.json), en lecture seule.
+    Les nœuds d'une recherche distribuée et leur coordinateur doivent avoir le même jeton dans leur config.json."""
+    return _read_config().get("search_service_token") or ""
+
+def ensure_search_service_token():
+    """Crée et enregistre le jeton s'il manque. Appelé au démarrage, depuis le thread principal."""
+    with _CONFIG_LOCK:
+        settings = _read_config()
+        token = settings.get("search_service_token")
+        if not token:
+            token = settings["search_service_token"] = secrets.token_urlsafe(32)
+            with open(RechercheDBAppTk.CONFIG_FILE_PATH, "w", encoding="utf-8") as f:
+                json.dump(settings, f, indent=4)
+    return token
+
+def shard_index(name, shard_count):
+    """Partition d'une entrée de premier niveau : stable d'une machine et d'une exécution à l'autre."""
+    return zlib.crc32(name.encode('utf-8', 'surrogateescape')) % shard_count
+
+def parse_search_nodes(text):
+    """'hote:port, port, ...' -> [(hote, port)] ; un port seul désigne un service de cette machine."""
+    nodes = []
+    for entry in re.split(r'[\s,;]+', text.strip()):
+        if not entry:
+            continue
+        host, _, port = entry.rpartition(':')
+        if not port.isdigit() or not 0 < int(port) < 65536:
+            raise ValueError(f"nœud invalide: {entry}")
+        nodes.append((host or DAEMON_HOST, int(port)))
+    return nodes
+
+class _DaemonQuery(RechercheDBAppTk):
+    """Exécute le worker de l'application sans interface : chaque message UI part en JSON (une ligne) vers le client."""
+    def __init__(self, wfile, cancel_event, raw_hits=False):
+        # Pas de RechercheDBAppTk.__init__ : aucune fenêtre, seul le worker de recherche est utilisé
+        self.wfile = wfile
+        self.cancel_event = cancel_event
+        self.raw_hits = raw_hits # Recherche distribuée : le coordinateur formate et filtre lui-même les hits
+
+    def _afficher_hit(self, output_mode, res_nom_fichier, res_index, res_ligne_content, res_offset, copies=()):
+        if self.raw_hits:
+            self._put_on_ui_queue("hit", res_nom_fichier, res_index, res_ligne_content, res_offset, list(copies))
+        else:
+            super()._afficher_hit(output_mode, res_nom_fichier, res_index, res_ligne_content, res_offset, copies)
+
+    def _put_on_ui_queue(self, *args):
+        if self.cancel_event.is_set():
+            return
+        try:
+            self.wfile.write((json.dumps(args, ensure_ascii=False) + "\n").encode('utf-8'))
+            self.wfile.flush()
+        except OSError:
+            self.cancel_event.set() # Client déconnecté : la recherche s'arrête au prochain tour
+
+class _SearchRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+            if not hmac.compare_digest(str(request.get("token") or ""), self.server.token):
+                raise ValueError("jeton du service absent ou invalide")
+            if not request.get("roots") or not request.get("term"):
+                raise ValueError("dossiers ou terme manquant")
+            options = request.get("options") or {}
+            if options.get("shard") and any(key in options for key in ("export_path", "checkpoint_enabled")):
+                raise ValueError("un nœud de recherche distribuée n'écrit ni export ni journal de reprise")
+            if options.get("read_ahead_depth"):
+                options["read_ahead_depth"] = max(0, min(int(options["read_ahead_depth"]), DAEMON_MAX_PREFETCH_DEPTH))
+            refused = [root for root in request["roots"] if not self.server.root_allowed(root)]
+            if refused:
+                raise ValueError(f"dossier(s) non autorisé(s) par le service: {', '.join(map(str, refused))}")
+        except (ValueError, AttributeError, TypeError) as e:
+            self.wfile.write((json.dumps(["append_text", f"[ERREUR] Requête invalide: {e}", "error_item"]) + "\n").encode('utf-8'))
+            return
+        self.server.run_query(self.wfile, request)
+
+class SearchDaemon(socketserver.ThreadingTCPServer):
+    """Service de recherche sur localhost. Le pool de processus est démarré une fois et réparti à parts égales
+    entre les requêtes en cours ; le cache de types de fichiers reste en mémoire et les index sur disque restent chauds.
+    Protocole : une ligne JSON de requête (avec le jeton partagé), puis les messages UI en lignes JSON jusqu'à la fermeture.
+    allowed_roots : si non vide, seuls ces dossiers et leurs sous-dossiers peuvent être parcourus."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port=DEFAULT_DAEMON_PORT, num_workers=None, host=DAEMON_HOST, token=None, allowed_roots=()):
+        self.token = token or ensure_search_service_token()
+        self.allowed_roots = [os.path.normcase(os.path.realpath(root)) for root in allowed_roots]
+        super().__init__((host, port), _SearchRequestHandler)
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=self.num_workers)
+        wait([self.executor.submit(os.getpid) for _ in range(self.num_workers)]) # Démarrer tous les processus maintenant
+        self.file_type_cache = FileTypeCache()
+        self.content_manifest = ContentManifest()
+        self.active_queries = 0
+        self.lock = threading.Lock()
+
+    def root_allowed(self, root):
+        if not self.allowed_roots:
+            return True
+        real = os.path.normcase(os.path.realpath(str(root)))
+        return any(real == allowed or real.startswith(allowed.rstrip(os.sep) + os.sep) for allowed in self.allowed_roots)
+
+    def fair_share(self):
+        """Fichiers en vol autorisés pour une requête : le pool divisé par le nombre de requêtes actives."""
+        with self.lock:
+            return max(1, self.num_workers // max(1, self.active_queries))
+
+    def run_query(self, wfile, request):
+        cancel_event = threading.Event()
+        options = {key: value for key, value in (request.get("options") or {}).items() if key in _DAEMON_QUERY_OPTIONS}
+        with self.lock:
+            self.active_queries += 1
+        try:
+            query = _DaemonQuery(wfile, cancel_event, raw_hits=bool(options.get("shard") or request.get("raw_hits")))
+            query._dossiersDb_recherche_worker(
+                list(request["roots"]), request["term"], list(request.get("extensions") or []),
+                bool(request.get("filter_duplicates")), self.num_workers,
+                [str(ex).lower() for ex in request.get("excluded") or []], bool(request.get("case_sensitive")),
+                executor=self.executor, fair_share=self.fair_share, cancel_event=cancel_event,
+                file_type_cache=self.file_type_cache, content_manifest=self.content_manifest, **options)
+            query._put_on_ui_queue("query_done") # Fin normale : sans ce message, le client sait que la requête a échoué
+        finally:
+            with self.lock:
+                self.active_queries -= 1
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+def run_search_daemon(port=DEFAULT_DAEMON_PORT, host=DAEMON_HOST):
+    """Lance le service de recherche : python DLU_V3.py --serve [port] [hote]
+    (hote 0.0.0.0 pour servir de nœud à un coordinateur distant)."""
+    import signal
+    def _stop(signum, frame):
+        raise KeyboardInterrupt
+    # SIGTERM doit aussi passer par server_close, sinon les workers du pool survivent au service
+    signal.signal(signal.SIGTERM, _stop)
+    allowed_roots = _read_config().get("search_service_roots") or ()
+    with SearchDaemon(port, host=host, allowed_roots=allowed_roots) as daemon:
+        print(f"Service de recherche à l'écoute sur {host}:{port} ({daemon.num_workers} workers), "
+              f"jeton : clé search_service_token de {os.path.abspath(RechercheDBAppTk.CONFIG_FILE_PATH)}", flush=True)
+        if allowed_roots:
+            print(f"Dossiers autorisés : {', '.join(allowed_roots)}", flush=True)
+        elif host not in (DAEMON_HOST, "localhost"):
+            print("Service joignable à distance sans search_service_roots : tous les dossiers lisibles peuvent être parcourus.", flush=True)
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+class _ConsoleRun(RechercheDBAppTk):
+    """Worker de l'application sans interface : les messages de texte et d'état sont écrits sur la sortie standard."""
+    def __init__(self):
+        pass # Pas de fenêtre
+
+    def _put_on_ui_queue(self, *args):
+        if args[0] in ("append_text", "status_label"):
+            print(args[1], flush=True)
+
+def run_query_batch(nom_lot):
+    """python DLU_V3.py --batch NOM : exécute un lot enregistré dans config.json (tâche planifiée à l'arrivée de nouveaux dumps),
+    avec les dossiers, extensions, exclusions et workers de l'application. Retourne le code de sortie."""
+    try:
+        with open(RechercheDBAppTk.CONFIG_FILE_PATH, "r", encoding="utf-8") as f:
+            settings = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Configuration illisible ({RechercheDBAppTk.CONFIG_FILE_PATH}): {e}")
+        return 1
+    requetes = settings.get("query_batches", {}).get(nom_lot)
+    if not requetes:
+        print(f"Lot inconnu: {nom_lot} (lots enregistrés: {', '.join(sorted(settings.get('query_batches', {}))) or 'aucun'})")
+        return 1
+    dossiers = [d for d in settings.get("root_folders", []) if os.path.isdir(d)]
+    if not dossiers:
+        print("Aucun dossier à parcourir dans la configuration.")
+        return 1
+    summary = _ConsoleRun()._lot_requetes_worker(nom_lot, requetes, dossiers, settings.get("current_extensions_list", []),
+                                                 settings.get("current_max_workers", 1), settings.get("current_excluded_paths_list", []),
+                                                 content_sniffing=settings.get("content_sniffing_enabled", False))
+    return 1 if summary["errors"] else 0
+
+def run_startup_benchmark():
+    """Mesure le démarrage à froid : import du module côté worker, affichage de la fenêtre, première ouverture des paramètres."""
+    import subprocess
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    probe = ("import time; t = time.perf_counter(); import DLU_V3, sys; "
+             "print(round((time.perf_counter() - t) * 1000, 1), 'tkinter' in sys.modules)")
+    worker_import_ms, worker_has_tk = subprocess.run([sys.executable, "-c", probe], cwd=script_dir,
+                                                     capture_output=True, text=True, check=True).stdout.split()
+    print(f"Import côté worker: {worker_import_ms} ms (tkinter importé: {worker_has_tk})")
+
+    _import_ui_modules()
+    root = tk.Tk()
+    app = RechercheDBAppTk(root)
+    root.update()
+    print(f"Fenêtre affichée: {(time.perf_counter() - _PROCESS_START) * 1000:.1f} ms après le lancement")
+    t = time.perf_counter()
+    app._toggle_view()
+    root.update()
+    print(f"Première ouverture des paramètres: {(time.perf_counter() - t) * 1000:.1f} ms")
+    root.destroy()
+
 if __name__ == "__main__":
     # Nécessaire pour ProcessPoolExecutor sur certaines plateformes (Windows notamment)
     # lors de la création d'exécutables ou dans certains environnements.
     multiprocessing.freeze_support() 
 
-    if TkinterDnD:
-        root = TkinterDnD.Tk() # Utiliser TkinterDnD.Tk() si disponible
-    else:
-        root = tk.Tk()
-        print("tkinterdnd2 non trouvé. La fonctionnalité de glisser-déposer ne sera pas disponible.")
-        print("Veuillez l'installer avec : pip install tkinterdnd2")
-
+    if "--bench-startup" in sys.argv:
+        run_startup_benchmark()
+        sys.exit(0)
+    if "--batch" in sys.argv:
+        batch_args = sys.argv[sys.argv.index("--batch") + 1:]
+        if not batch_args:
+            print("Usage: python DLU_V3.py --batch NOM")
+            sys.exit(2)
+        sys.exit(run_query_batch(batch_args[0]))
+    if "--serve" in sys.argv:
+        serve_args = sys.argv[sys.argv.index("--serve") + 1:]
+        run_search_daemon(int(serve_args[0]) if serve_args and serve_args[0].isdigit() else DEFAULT_DAEMON_PORT,
+                          serve_args[1] if len(serve_args) > 1 and not serve_args[1].startswith("--") else DAEMON_HOST)
+        sys.exit(0)
+
+    _import_ui_modules()
+    root = tk.Tk() # tkinterdnd2 est chargé plus tard dans cette même fenêtre (_setup_drag_and_drop)
     app = RechercheDBAppTk(root)
     root.mainloop()